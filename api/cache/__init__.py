@@ -0,0 +1,3 @@
+from .persistent import PersistentCache
+
+__all__ = ["PersistentCache"]
@@ -0,0 +1,226 @@
+"""
+Cache LRU + TTL con respaldo opcional en SQLite.
+
+Hay un primer nivel en memoria (OrderedDict) y, si se configura `path`, un segundo
+nivel en disco que sobrevive reinicios y se comparte entre workers del mismo host.
+Los valores se guardan como JSON.
+
+La recencia del LRU vive en memoria: un hit no escribe en disco, las claves
+leídas se acumulan y su accessed_at se actualiza en lote con la próxima escritura.
+Los handlers async usan aget/aset/adelete, que hacen el I/O de SQLite en un thread.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PersistentCache:
+    def __init__(self, namespace: str, path: Optional[str] = None, max_entries: int = 1000, ttl: Optional[float] = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # _lock protege la memoria y nunca se sostiene durante I/O; _db_lock serializa
+        # el uso de la conexión SQLite
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # clave -> (valor, guardado_en)
+        self._mem: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        # clave -> último acceso, pendiente de bajar a disco
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        if path:
+            try:
+                self._db = self._open(path)
+            except Exception:
+                logger.exception("No se pudo abrir el cache en disco %s; se usa sólo memoria", path)
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)")
+        return db
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _mem_put(self, key: str, value: Any, created_at: float) -> None:
+        self._mem[key] = (value, created_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _mem_get(self, key: str, now: float) -> Tuple[bool, Any]:
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                if not self._expired(item[1], now):
+                    self._mem.move_to_end(key)
+                    self._touch(key, now)
+                    self.hits += 1
+                    return True, item[0]
+                del self._mem[key]
+            if self._db is None:
+                self.misses += 1
+                return True, None
+        return False, None
+
+    def _touch(self, key: str, now: float) -> None:
+        # El accessed_at en disco se actualiza en lote con la próxima escritura
+        if self._db is None:
+            return
+        self._touched[key] = now
+        if len(self._touched) > self.max_entries:
+            self._touched.pop(next(iter(self._touched)))
+
+    def _disk_get(self, key: str, now: float) -> Optional[Any]:
+        value = None
+        with self._db_lock:
+            try:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is not None:
+                    if self._expired(row[1], now):
+                        self._db.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    else:
+                        value = json.loads(row[0])
+            except sqlite3.Error:
+                logger.exception("Error leyendo cache en disco")
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self._mem_put(key, value, row[1])
+            self._touch(key, now)
+            self.hits += 1
+        return value
+
+    def _disk_set(self, key: str, value: Any, now: float) -> None:
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        touched.pop(key, None)
+        with self._db_lock:
+            try:
+                # Una transacción (la conexión está en autocommit)
+                self._db.execute("BEGIN")
+                try:
+                    if touched:
+                        self._db.executemany(
+                            "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                            [(t, self.namespace, k) for k, t in touched.items()],
+                        )
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                        (self.namespace, key, json.dumps(value), now, now),
+                    )
+                    # Desalojo LRU en disco
+                    self._db.execute(
+                        """
+                        DELETE FROM cache WHERE namespace = ? AND key IN (
+                            SELECT key FROM cache WHERE namespace = ?
+                            ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                        )
+                        """,
+                        (self.namespace, self.namespace, self.max_entries),
+                    )
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error:
+                logger.exception("Error escribiendo cache en disco")
+
+    def _disk_delete(self, key: str) -> None:
+        with self._db_lock:
+            try:
+                self._db.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+            except sqlite3.Error:
+                logger.exception("Error borrando del cache en disco")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        found, value = self._mem_get(key, now)
+        if found:
+            return value
+        return self._disk_get(key, now)
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._mem_put(key, value, now)
+        if self._db is not None:
+            self._disk_set(key, value, now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._mem.pop(key, None)
+            self._touched.pop(key, None)
+        if self._db is not None:
+            self._disk_delete(key)
+
+    # Versiones para handlers async: la memoria se consulta en el event loop y el
+    # disco (que puede esperar hasta `timeout` por el lock de SQLite) en un thread
+
+    async def aget(self, key: str) -> Optional[Any]:
+        now = time.time()
+        found, value = self._mem_get(key, now)
+        if found:
+            return value
+        return await asyncio.to_thread(self._disk_get, key, now)
+
+    async def aset(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._mem_put(key, value, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, now)
+
+    async def adelete(self, key: str) -> None:
+        with self._lock:
+            self._mem.pop(key, None)
+            self._touched.pop(key, None)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_delete, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._touched.clear()
+        if self._db is not None:
+            with self._db_lock:
+                try:
+                    self._db.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+                except sqlite3.Error:
+                    logger.exception("Error limpiando cache en disco")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries_in_memory": len(self._mem)}
@@ -14,15 +14,102 @@ class Settings(BaseSettings):
     SUPABASE_SERVICE_KEY: Optional[str] = Field(None, env="SUPABASE_SERVICE_KEY")
     SUPABASE_JWT_SECRET: Optional[str] = Field(None, env="SUPABASE_JWT_SECRET")
 
+    # Backend del repositorio de alimentos: supabase (PostgREST) | sql (DATABASE_URL) | memory
+    REPO_BACKEND: str = Field("supabase", env="REPO_BACKEND")
+
     # Connection String para ejecutar querys directo en base a las querys hechas por el LLM
     DATABASE_URL: Optional[str] = Field(None, env="DATABASE_URL")
+    DB_POOL_SIZE: int = Field(10, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(10, env="DB_MAX_OVERFLOW")
+    # Descarta conexiones muertas antes de usarlas y las recicla (segundos) antes de que
+    # las corte el pooler/servidor
+    DB_POOL_PRE_PING: bool = Field(True, env="DB_POOL_PRE_PING")
+    DB_POOL_RECYCLE: int = Field(1800, env="DB_POOL_RECYCLE")
+
+    # Reintentos con backoff exponencial + jitter (segundos) y circuit breaker
+    DB_RETRY_BASE_DELAY: float = Field(0.2, env="DB_RETRY_BASE_DELAY")
+    DB_RETRY_MAX_DELAY: float = Field(2.0, env="DB_RETRY_MAX_DELAY")
+    REPO_RETRIES: int = Field(2, env="REPO_RETRIES")
+    BREAKER_FAILURE_THRESHOLD: int = Field(5, env="BREAKER_FAILURE_THRESHOLD")
+    BREAKER_RESET_SECONDS: float = Field(30, env="BREAKER_RESET_SECONDS")
+
+    # Guardas del SQL generado por el LLM: LIMIT máximo, presupuesto de costo estático,
+    # costo máximo según EXPLAIN (opcional) y statement_timeout por sentencia
+    SQL_MAX_LIMIT: int = Field(500, env="SQL_MAX_LIMIT")
+    SQL_COST_BUDGET: float = Field(25, env="SQL_COST_BUDGET")
+    SQL_EXPLAIN_MAX_COST: Optional[float] = Field(None, env="SQL_EXPLAIN_MAX_COST")
+    SQL_STATEMENT_TIMEOUT_MS: int = Field(5000, env="SQL_STATEMENT_TIMEOUT_MS")
+
+    # Réplica local (SQLite) para ejecutar el SQL validado de /ask: off | memory | file
+    SQL_REPLICA_MODE: str = Field("off", env="SQL_REPLICA_MODE")
+    SQL_REPLICA_PATH: str = Field("cache/replica.sqlite3", env="SQL_REPLICA_PATH")
+    SQL_REPLICA_REFRESH_SECONDS: int = Field(600, env="SQL_REPLICA_REFRESH_SECONDS")
+
+    # Cache de resultados de execute_sql (presupuesto en bytes)
+    RESULT_CACHE_ENABLED: bool = Field(True, env="RESULT_CACHE_ENABLED")
+    RESULT_CACHE_MAX_BYTES: int = Field(32 * 1024 * 1024, env="RESULT_CACHE_MAX_BYTES")
+
+    # Carga masiva (POST /alimentos/bulk): filas por lote y tope de errores detallados
+    BULK_CHUNK_SIZE: int = Field(1000, env="BULK_CHUNK_SIZE")
+    BULK_MAX_ERRORES: int = Field(1000, env="BULK_MAX_ERRORES")
+
+    # Cache-Control (max-age en segundos) de las lecturas del catálogo con ETag
+    CATALOG_CACHE_MAX_AGE: int = Field(300, env="CATALOG_CACHE_MAX_AGE")
+
+    # Serialización rápida (orjson, sin revalidar filas) de las respuestas de alimentos
+    FAST_JSON_ENABLED: bool = Field(False, env="FAST_JSON_ENABLED")
+
+    # Monitor de salud en segundo plano (/health/live y /health/ready leen su cache)
+    HEALTH_CHECK_INTERVAL: float = Field(15, env="HEALTH_CHECK_INTERVAL")
+    HEALTH_CHECK_TIMEOUT: float = Field(5, env="HEALTH_CHECK_TIMEOUT")
+
+    # Warm-up del arranque: conexiones del pool que se abren antes de marcar ready, y si
+    # el arranque (snapshot, réplica, warm-up) corre en segundo plano para que
+    # /health/live responda enseguida mientras /health/ready sigue en 503
+    DB_WARMUP_CONNECTIONS: int = Field(2, env="DB_WARMUP_CONNECTIONS")
+    STARTUP_BACKGROUND: bool = Field(False, env="STARTUP_BACKGROUND")
 
     # Timeout
     REQUEST_TIMEOUT: int = Field(30, env="REQUEST_TIMEOUT")
 
+    # Snapshot en memoria de la tabla alimentos (se carga al startup)
+    SNAPSHOT_ENABLED: bool = Field(True, env="SNAPSHOT_ENABLED")
+
     # API Key de Google GenAI
     GENAI_API_KEY: Optional[str] = Field(None, env="GENAI_API_KEY")
 
+    # Gateway LLM: tope de llamadas concurrentes a Gemini y hedging opcional sobre el p95
+    LLM_MAX_CONCURRENCY: int = Field(16, env="LLM_MAX_CONCURRENCY")
+    LLM_HEDGE_ENABLED: bool = Field(False, env="LLM_HEDGE_ENABLED")
+
+    # Máximo de recetas generándose a la vez en POST /recetas/batch
+    RECETA_BATCH_CONCURRENCY: int = Field(8, env="RECETA_BATCH_CONCURRENCY")
+
+    # Traductor por reglas de /ask para las preguntas frecuentes (sin LLM)
+    ASK_FASTPATH_ENABLED: bool = Field(True, env="ASK_FASTPATH_ENABLED")
+
+    # Micro-batching de /ask: las preguntas que llegan dentro de la ventana (o hasta
+    # juntar ASK_BATCH_MAX) se traducen en una sola llamada al LLM
+    ASK_BATCH_ENABLED: bool = Field(False, env="ASK_BATCH_ENABLED")
+    ASK_BATCH_WINDOW_MS: float = Field(50, env="ASK_BATCH_WINDOW_MS")
+    ASK_BATCH_MAX: int = Field(16, env="ASK_BATCH_MAX")
+
+    # Cache pregunta -> SQL del asistente (/ask). Path vacío = sólo en memoria
+    LLM_CACHE_ENABLED: bool = Field(True, env="LLM_CACHE_ENABLED")
+    LLM_CACHE_PATH: Optional[str] = Field("cache/llm_cache.sqlite3", env="LLM_CACHE_PATH")
+    LLM_CACHE_MAX_ENTRIES: int = Field(2000, env="LLM_CACHE_MAX_ENTRIES")
+    LLM_CACHE_TTL: int = Field(7 * 24 * 3600, env="LLM_CACHE_TTL")
+
+    # Cache de recetas por conjunto de ingredientes (códigos ordenados + gramos redondeados
+    # a RECETA_CACHE_RESOLUCION_G). Con RECETA_CACHE_VARIANTES > 1 se generan recetas nuevas
+    # hasta juntar ese número por clave y después se sirve una al azar. Usa el mismo
+    # archivo que LLM_CACHE_PATH, en otro namespace
+    RECETA_CACHE_ENABLED: bool = Field(True, env="RECETA_CACHE_ENABLED")
+    RECETA_CACHE_RESOLUCION_G: float = Field(10, env="RECETA_CACHE_RESOLUCION_G")
+    RECETA_CACHE_VARIANTES: int = Field(1, env="RECETA_CACHE_VARIANTES")
+    RECETA_CACHE_MAX_ENTRIES: int = Field(2000, env="RECETA_CACHE_MAX_ENTRIES")
+    RECETA_CACHE_TTL: int = Field(30 * 24 * 3600, env="RECETA_CACHE_TTL")
+
     # Configuración de pydantic-settings
     model_config = SettingsConfigDict(
         env_file=".env",
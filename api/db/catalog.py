@@ -0,0 +1,95 @@
+"""
+Notificaciones de cambios en el catálogo de alimentos.
+
+Todo camino de escritura (insert_alimento y los que vengan) llama a
+notify_catalog_changed; los caches y estructuras derivadas se registran con
+on_catalog_change para invalidarse o actualizarse.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Callable, Dict, List, Optional
+
+from api.db.snapshot import NUMERIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# rows = filas nuevas/actualizadas, o None si no se sabe qué cambió (recargar todo)
+CatalogListener = Callable[[Optional[List[dict]]], None]
+
+_listeners: List[CatalogListener] = []
+
+# Versión del catálogo (para ETags): suma (mod 2**128) de un hash por fila, así que
+# depende sólo del contenido y no del orden en que se aplicaron los cambios; dos
+# procesos con las mismas filas dan la misma versión. Se siembra con la tabla
+# completa (snapshot o fetch_all_rows). Mientras el contenido no se conoce (antes
+# de sembrar, o tras un cambio sin filas hasta recargar) la versión sale de un
+# contador de escrituras del proceso, que igual cambia con cada escritura.
+_MOD = 1 << 128
+_row_digests: Dict[int, int] = {}
+_digest: Optional[int] = None
+_writes = 0
+
+
+def _row_digest(row: dict) -> int:
+    canon = [int(row["codigomex2"]), row.get("nombre_del_alimento")] + [
+        None if row.get(c) is None else float(row[c]) for c in NUMERIC_COLUMNS
+    ]
+    raw = json.dumps(canon, ensure_ascii=False, separators=(",", ":"))
+    return int.from_bytes(hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest(), "big")
+
+
+def catalog_version() -> str:
+    return f"w{_writes}" if _digest is None else format(_digest, "032x")
+
+
+def set_catalog_rows(rows: Optional[List[dict]]) -> None:
+    """
+    Recalcula la versión desde la tabla completa (al cargar el snapshot o, sin él,
+    con fetch_all_rows). Con None el contenido queda desconocido.
+    """
+    global _digest
+    _row_digests.clear()
+    if rows is None:
+        _digest = None
+        return
+    for row in rows:
+        if row.get("codigomex2") is not None:
+            _row_digests[int(row["codigomex2"])] = _row_digest(row)
+    _digest = sum(_row_digests.values()) % _MOD
+
+
+def _apply_rows(rows: Optional[List[dict]]) -> None:
+    global _digest
+    if rows is None:
+        set_catalog_rows(None)
+        return
+    if _digest is None:
+        return
+    for row in rows:
+        if row.get("codigomex2") is None:
+            continue
+        codigo = int(row["codigomex2"])
+        nuevo = _row_digest(row)
+        _digest = (_digest - _row_digests.get(codigo, 0) + nuevo) % _MOD
+        _row_digests[codigo] = nuevo
+
+
+def on_catalog_change(listener: CatalogListener) -> CatalogListener:
+    """
+    Registra un listener. Se puede usar como decorador.
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def notify_catalog_changed(rows: Optional[List[dict]] = None) -> None:
+    global _writes
+    _writes += 1
+    _apply_rows(rows)
+    for listener in list(_listeners):
+        try:
+            listener(rows)
+        except Exception:
+            logger.exception("Listener de cambios de catálogo falló: %s", getattr(listener, "__name__", listener))
@@ -1,9 +1,29 @@
-from supabase import create_client, Client
+import asyncio
+from typing import TYPE_CHECKING
 from api.config import settings
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
 _supabase_url = str(settings.SUPABASE_URL) if settings.SUPABASE_URL is not None else None
 
-supabase: Client | None = None
-if _supabase_url and settings.SUPABASE_SERVICE_KEY:
-    supabase = create_client(_supabase_url, settings.SUPABASE_SERVICE_KEY)
+# El cliente async se crea con una corutina, así que se inicializa en el primer uso.
+# La librería también se importa recién ahí (pesa ~150 ms en el arranque en frío).
+_supabase: "AsyncClient | None" = None
+_supabase_lock = asyncio.Lock()
+
 
+async def get_supabase() -> "AsyncClient | None":
+    """
+    Devuelve el cliente async de Supabase (None si no está configurado).
+    """
+    global _supabase
+    if _supabase is not None:
+        return _supabase
+    if not (_supabase_url and settings.SUPABASE_SERVICE_KEY):
+        return None
+    async with _supabase_lock:
+        if _supabase is None:
+            from supabase import acreate_client
+            _supabase = await acreate_client(_supabase_url, settings.SUPABASE_SERVICE_KEY)
+    return _supabase
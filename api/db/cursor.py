@@ -0,0 +1,38 @@
+"""
+Cursores opacos para paginación por keyset.
+
+El cursor codifica la clave de orden de la última fila devuelta (el codigomex2, o
+la clave de relevancia en la búsqueda por nombre), así la página siguiente es un
+"WHERE clave > cursor" sobre el índice en lugar de un OFFSET que recorre todo lo
+anterior y se corre cuando entran filas nuevas.
+"""
+
+import base64
+import json
+from typing import Iterable, List, Optional, Sequence
+
+
+def encode_cursor(clave: Sequence[int]) -> str:
+    raw = json.dumps([int(v) for v in clave], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str], largos: Iterable[int] = (1,)) -> Optional[List[int]]:
+    """
+    Devuelve la clave del cursor, o None si el token es vacío (primera página).
+    Lanza ValueError si el token no es válido o no tiene uno de los `largos` esperados.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        clave = json.loads(raw)
+    except Exception as e:
+        raise ValueError("cursor inválido") from e
+    if (
+        not isinstance(clave, list)
+        or len(clave) not in tuple(largos)
+        or not all(isinstance(v, int) and not isinstance(v, bool) for v in clave)
+    ):
+        raise ValueError("cursor inválido")
+    return clave
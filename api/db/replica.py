@@ -0,0 +1,269 @@
+"""
+Réplica local (SQLite embebido) de la tabla `alimentos`.
+
+El SQL de /ask ya validado se ejecuta acá en lugar de ir al Postgres remoto:
+sin salto de red ni fallas de la DB remota en el camino caliente. La réplica se
+recarga desde Postgres (o Supabase si no hay DATABASE_URL) cada
+SQL_REPLICA_REFRESH_SECONDS y se actualiza con cada escritura del catálogo.
+
+Para que la réplica devuelva lo mismo que Postgres, _to_sqlite ajusta el dialecto:
+- ILIKE pasa a MATCH, que en SQLite llama a la función match() registrada en la
+  conexión (comparación sin mayúsculas también fuera de ASCII: 'ALGODÓN'), y LIKE
+  usa una like() sensible a mayúsculas con '\\' como escape, como en Postgres,
+- cada ítem de ORDER BY sin NULLS explícito recibe el orden de Postgres (NULLS LAST
+  en ASC, NULLS FIRST en DESC; SQLite hace lo contrario),
+- se quitan los casts (::numeric).
+"""
+
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import sqlparse
+from sqlparse import tokens as T
+
+from api.config import settings
+from api.db.catalog import on_catalog_change
+from api.db.repositories.alimento_repo import fetch_all_rows
+from api.db.session import get_async_engine
+from api.db.snapshot import COLUMNS, NUMERIC_COLUMNS
+from api.db.sql import execute_sql
+
+logger = logging.getLogger(__name__)
+
+TABLE = "alimentos"
+
+_DDL = (
+    f"CREATE TABLE {TABLE} (codigomex2 INTEGER PRIMARY KEY, nombre_del_alimento TEXT NOT NULL, "
+    + ", ".join(f"{c} REAL" for c in NUMERIC_COLUMNS)
+    + ")"
+)
+_UPSERT = (
+    f"INSERT OR REPLACE INTO {TABLE} ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+)
+
+# Diferencias de dialecto Postgres -> SQLite que aparecen en el SQL del LLM
+_CASTS = re.compile(r"::\s*[a-z_]+(\s*\(\s*\d+(\s*,\s*\d+)?\s*\))?", re.IGNORECASE)
+_ILIKE = re.compile(r"\bilike\b", re.IGNORECASE)
+# Cierran la lista del ORDER BY (además de "," y ")")
+_FIN_ORDEN = {"LIMIT", "OFFSET"}
+
+
+@lru_cache(maxsize=1024)
+def _to_sqlite(sql: str) -> str:
+    out: List[str] = []
+    # Por nivel de paréntesis: None fuera de un ORDER BY, si no [desc, trae_nulls]
+    orden: List[Optional[List[bool]]] = [None]
+    fin_item = 0  # posición en out después del último token no vacío
+
+    def cerrar_item() -> None:
+        item = orden[-1]
+        if item is not None and not item[1]:
+            out.insert(fin_item, " NULLS FIRST" if item[0] else " NULLS LAST")
+
+    for tok in sqlparse.parse(_CASTS.sub("", sql))[0].flatten():
+        value = tok.value
+        if tok.ttype is T.Keyword.Order:
+            if orden[-1] is not None:
+                palabras = value.upper().split()
+                orden[-1] = [palabras[0] == "DESC", "NULLS" in palabras]
+        elif tok.ttype in T.Keyword and " ".join(value.upper().split()) == "ORDER BY":
+            cerrar_item()
+            out.append(value)
+            fin_item = len(out)
+            orden[-1] = [False, False]
+            continue
+        elif tok.ttype in T.Keyword and value.upper() in _FIN_ORDEN:
+            cerrar_item()
+            orden[-1] = None
+        elif tok.ttype in T.Operator.Comparison:
+            # "ILIKE" y "NOT ILIKE" llegan como un solo token
+            value = _ILIKE.sub("MATCH", value)
+        elif tok.ttype is T.Punctuation:
+            if value == "(":
+                orden.append(None)
+            elif value == ")":
+                cerrar_item()
+                if len(orden) > 1:
+                    orden.pop()
+            elif value == "," and orden[-1] is not None:
+                cerrar_item()
+                orden[-1] = [False, False]
+            elif value == ";":
+                cerrar_item()
+                orden[-1] = None
+        out.append(value)
+        if not tok.is_whitespace:
+            fin_item = len(out)
+    cerrar_item()
+    return "".join(out)
+
+
+@lru_cache(maxsize=256)
+def _patron_like(patron: str, sin_mayusculas: bool) -> re.Pattern:
+    # % -> .*, _ -> ., la barra invertida escapa el carácter siguiente (como en Postgres)
+    partes: List[str] = []
+    i = 0
+    while i < len(patron):
+        ch = patron[i]
+        if ch == "\\" and i + 1 < len(patron):
+            partes.append(re.escape(patron[i + 1]))
+            i += 2
+            continue
+        partes.append(".*" if ch == "%" else "." if ch == "_" else re.escape(ch))
+        i += 1
+    return re.compile("".join(partes), re.DOTALL | (re.IGNORECASE if sin_mayusculas else 0))
+
+
+def _like(patron: Any, valor: Any) -> Optional[bool]:
+    if patron is None or valor is None:
+        return None
+    return _patron_like(str(patron), False).fullmatch(str(valor)) is not None
+
+
+def _ilike(patron: Any, valor: Any) -> Optional[bool]:
+    if patron is None or valor is None:
+        return None
+    return _patron_like(str(patron), True).fullmatch(str(valor)) is not None
+
+
+def _values(row: Dict[str, Any]) -> tuple:
+    values = [int(row["codigomex2"]), row.get("nombre_del_alimento")]
+    for c in NUMERIC_COLUMNS:
+        v = row.get(c)
+        values.append(None if v is None else float(v))
+    return tuple(values)
+
+
+class LocalReplica:
+    def __init__(self, path: Optional[str] = None):
+        # path None -> en memoria
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def is_loaded(self) -> bool:
+        return self._conn is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.path:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+        else:
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+        # "x LIKE p" llama a like(p, x) y "x MATCH p" a match(p, x)
+        conn.create_function("like", 2, _like, deterministic=True)
+        conn.create_function("match", 2, _ilike, deterministic=True)
+        return conn
+
+    def load(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Reemplaza el contenido entero de la réplica en una sola transacción.
+        """
+        with self._lock:
+            conn = self._conn or self._connect()
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+                conn.execute(_DDL)
+                conn.executemany(_UPSERT, [_values(r) for r in rows])
+            self._conn = conn
+        logger.info("Réplica local cargada: %d filas", len(rows))
+
+    def upsert(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            with self._conn:
+                self._conn.executemany(_UPSERT, [_values(r) for r in rows if r.get("codigomex2") is not None])
+
+    def _execute(self, sql: str, params: Optional[dict]) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._conn is None:
+                raise RuntimeError("Réplica local no cargada")
+            # Corta consultas que superen REQUEST_TIMEOUT (sqlite3.OperationalError: interrupted)
+            deadline = time.monotonic() + settings.REQUEST_TIMEOUT
+            self._conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 10000)
+            try:
+                cur = self._conn.execute(_to_sqlite(sql), params or {})
+                names = [d[0] for d in cur.description or []]
+                return [dict(zip(names, r)) for r in cur.fetchall()]
+            finally:
+                self._conn.set_progress_handler(None, 0)
+
+    async def execute(self, sql: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        # En un thread para no frenar el event loop con una consulta pesada
+        return await asyncio.to_thread(self._execute, sql, params)
+
+
+replica: Optional[LocalReplica] = None
+if settings.SQL_REPLICA_MODE in ("memory", "file"):
+    replica = LocalReplica(settings.SQL_REPLICA_PATH if settings.SQL_REPLICA_MODE == "file" else None)
+
+
+async def _fetch_remote_rows() -> List[Dict[str, Any]]:
+    if get_async_engine() is not None:
+        return await execute_sql(f"SELECT * FROM {TABLE} ORDER BY codigomex2", use_cache=False)
+    # Sin DATABASE_URL: misma fuente que el snapshot
+    return await fetch_all_rows()
+
+
+async def refresh_replica() -> bool:
+    if replica is None:
+        return False
+    try:
+        rows = await _fetch_remote_rows()
+        await asyncio.to_thread(replica.load, rows)
+        return True
+    except Exception:
+        logger.exception("No se pudo recargar la réplica local")
+        return False
+
+
+async def replica_refresh_loop() -> None:
+    """
+    Recarga periódica (se lanza como tarea al startup).
+    """
+    interval = settings.SQL_REPLICA_REFRESH_SECONDS
+    while True:
+        await asyncio.sleep(interval)
+        await refresh_replica()
+
+
+# Tareas de sincronización en segundo plano (referencia para que no las recolecte el GC)
+_background_tasks: set = set()
+# Los upserts se aplican en el orden en que llegaron los cambios
+_upsert_lock = asyncio.Lock()
+
+
+async def _upsert_replica(rows: List[dict]) -> None:
+    try:
+        async with _upsert_lock:
+            await asyncio.to_thread(replica.upsert, rows)
+    except Exception:
+        logger.exception("No se pudo actualizar la réplica local")
+
+
+@on_catalog_change
+def _sync_replica(rows: Optional[List[dict]]) -> None:
+    if replica is None or not replica.is_loaded():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.warning("Sin event loop activo: no se pudo sincronizar la réplica")
+        return
+    # El upsert toma el lock de la réplica (que puede estar ocupado por una
+    # consulta): en un thread, fuera del event loop
+    task = loop.create_task(_upsert_replica(rows) if rows is not None else refresh_replica())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
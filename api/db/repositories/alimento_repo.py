@@ -1,82 +1,211 @@
-from api.db.connection import supabase
-from typing import List, Optional, Dict, Any
+from api.db.session import get_async_engine
+from api.db.snapshot import snapshot, COLUMNS
+from api.db.sql import stream_sql
+from api.db.catalog import on_catalog_change, notify_catalog_changed, set_catalog_rows
+from api.db.repositories.backends import get_backend
+from api.db.resilience import call_with_resilience, repo_breaker
+from api.config import settings
+from typing import List, Optional, Dict, Any, AsyncIterator, Sequence, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 TABLE = "alimentos"
 
-def get_all(limit: int = 100, offset: int = 0) -> List[dict]:
-    resp = supabase.table(TABLE).select("*").limit(limit).offset(offset).execute()
-    # resp es un dict-like, se accede como atributo o clave
-    return resp.data or []
+# Tareas de recarga en segundo plano (se guarda la referencia para que no las recolecte el GC)
+_background_tasks: set = set()
 
 
-def get_by_codigo(codigo: int):
-    resp = supabase.table(TABLE).select("*").eq("codigomex2", codigo).limit(1).execute()
+async def _call(fn, retry: bool = True):
+    """
+    Llamada al backend con circuit breaker; las lecturas (idempotentes) se reintentan
+    ante fallas transitorias, las escrituras no.
+    """
+    return await call_with_resilience(fn, repo_breaker, retries=settings.REPO_RETRIES if retry else 1)
+
+
+async def get_all(limit: int = 100, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+    """
+    Lista ordenada por codigomex2. Con `after` pagina por keyset (codigomex2 > after):
+    cada página es un seek sobre la PK en lugar de un OFFSET.
+    """
+    cached = snapshot.page(limit=limit, offset=offset, after=after)
+    if cached is not None:
+        return cached
 
-    # Si no hay filas
-    if not resp.data or len(resp.data) == 0:
-        return None
+    return await _call(lambda: get_backend().get_all(limit=limit, offset=offset, after=after))
 
-    # Si encuentra 1 fila
-    return resp.data[0]
 
+async def get_by_codigo(codigo: int):
+    return await _call(lambda: get_backend().get_by_codigo(codigo))
 
-def get_by_codigos(codigos: List[int]) -> List[dict]:
+
+async def get_by_codigos(codigos: List[int]) -> List[dict]:
     """
     Devuelve todos los alimentos cuyo codigomex2 esté en la lista `codigos`.
     """
     if not codigos:
         return []
-
-    resp = supabase.table(TABLE).select("*").in_("codigomex2", codigos).execute()
-    return resp.data or []
+    return await _call(lambda: get_backend().get_by_codigos(codigos))
 
 
-def search_by_nombre(nombre: str, limit: int = 50, offset: int = 0) -> List[dict]:
+async def search_by_nombre(nombre: str, limit: int = 50, offset: int = 0) -> List[dict]:
     """
     Busca alimentos cuyo nombre_del_alimento contenga el texto (esto, para que hacer recetas en el front sea mas facil).
     Ej: "ALGOD" -> "ACEITE DE ALGODON"
+    Si el snapshot está cargado se resuelve con el índice de trigramas (ignora acentos
+    y ordena por relevancia); si no, cae al backend (ilike, ordenado por código).
+    """
+    cached = snapshot.search_nombre(nombre, limit=limit, offset=offset)
+    if cached is not None:
+        return cached
+    return await _call(lambda: get_backend().search_by_nombre(nombre, limit=limit, offset=offset))
+
+
+async def search_by_nombre_keyset(
+    nombre: str,
+    limit: int = 50,
+    after: Optional[Sequence[int]] = None,
+) -> Tuple[List[dict], Optional[List[int]]]:
+    """
+    Búsqueda por nombre paginada por keyset. Devuelve (filas, clave_de_la_última).
+    Con el snapshot la clave es la de relevancia (nivel, posición, largo, código);
+    sin él, el ilike del backend se ordena por código y la clave es [codigomex2].
+    La forma de `after` indica con qué orden se generó el cursor.
+    """
+    if after is None or len(after) == 4:
+        hits = snapshot.search_nombre_claves(nombre, limit=limit, after=after)
+        if hits is not None:
+            clave = list(hits[-1][0]) if hits else None
+            return [row for _, row in hits], clave
+
+    rows = await _call(lambda: get_backend().search_by_nombre(
+        nombre, limit=limit, after=None if after is None else after[-1]
+    ))
+    return rows, ([int(rows[-1]["codigomex2"])] if rows else None)
+
+
+async def insert_alimento(obj: dict) -> dict:
+    created = await _call(lambda: get_backend().insert_alimento(obj), retry=False)
+    if created:
+        notify_catalog_changed([created])
+    return created
+
+
+async def insert_alimentos_bulk(rows: List[dict]) -> List[Tuple[int, str]]:
+    """
+    Inserta un lote de filas ya validadas (COPY en el backend sql, insert multi-fila
+    en supabase). Si el lote falla se reintenta fila por fila para aislar las que
+    tienen error. Devuelve [(indice_en_el_lote, error)].
+    No notifica el cambio del catálogo: lo hace el llamador al terminar la carga.
+    """
+    if not rows:
+        return []
+    return await _call(lambda: get_backend().insert_many(rows), retry=False)
+
+
+async def fetch_all_rows() -> List[dict]:
+    """
+    La tabla completa ordenada por código (para armar el snapshot y la réplica).
+    """
+    return await _call(lambda: get_backend().fetch_all_rows())
+
+
+def can_stream_all() -> bool:
+    return get_async_engine() is not None or snapshot.is_loaded()
+
+
+async def stream_all(batch_size: int = 500) -> AsyncIterator[List[dict]]:
+    """
+    Recorre la tabla completa por lotes. Con DATABASE_URL usa un cursor del lado del
+    servidor; si no, sirve desde el snapshot en memoria.
+    """
+    if get_async_engine() is not None:
+        sql = f"SELECT {', '.join(COLUMNS)} FROM {TABLE} ORDER BY codigomex2"
+        async for batch in stream_sql(sql, batch_size=batch_size):
+            yield batch
+        return
+
+    data = snapshot.data()
+    if data is None:
+        raise RuntimeError("No hay DATABASE_URL ni snapshot cargado para exportar")
+    for i in range(0, len(data.rows), batch_size):
+        yield data.rows[i:i + batch_size]
+
+
+async def load_snapshot() -> bool:
+    """
+    Carga (o recarga) el snapshot en memoria. Devuelve False si no se pudo.
+    """
+    backend = get_backend()
+    if not backend.is_configured():
+        logger.warning("Backend %s no configurado: snapshot de alimentos deshabilitado", backend.name)
+        return False
+    try:
+        rows = await fetch_all_rows()
+        snapshot.load(rows)
+        set_catalog_rows(rows)
+        return True
+    except Exception:
+        logger.exception("No se pudo cargar el snapshot de alimentos")
+        return False
+
+
+async def refresh_catalog_version() -> bool:
+    """
+    Sin snapshot: siembra la versión del catálogo (ETags) con la tabla completa.
+    """
+    if not get_backend().is_configured():
+        return False
+    try:
+        set_catalog_rows(await fetch_all_rows())
+        return True
+    except Exception:
+        logger.exception("No se pudo calcular la versión del catálogo")
+        return False
+
+
+async def catalog_version_loop() -> None:
+    """
+    Sin snapshot las lecturas van a la DB compartida, donde escriben otros procesos:
+    la versión se recalcula cada CATALOG_CACHE_MAX_AGE, la misma ventana que ya
+    acepta el Cache-Control.
     """
-    resp = (
-        supabase.table(TABLE)
-        .select("*")
-        .ilike("nombre_del_alimento", f"%{nombre}%")
-        .limit(limit)
-        .offset(offset)
-        .execute()
-    )
-    return resp.data or []
-
-
-
-def insert_alimento(obj: dict) -> dict:
-    resp = supabase.table(TABLE).insert(obj).execute()
-    return resp.data[0] if resp.data else None
-
-
-def search_alimentos(filters: Dict[str, Any], limit: int = 100, offset: int = 0) -> List[dict]:
-    field_map = {
-        "calorias": "energ_kcal",
-        "carbohidratos": "carbohydrt",
-        "proteina": "protein",
-        "lipidos": "lipid_tot",
-    }
-
-    qb = supabase.table(TABLE).select("*")
-    for k, v in filters.items():
-        if v is None:
-            continue
-        if k.startswith("min_"):
-            raw = k[4:]
-            col = field_map.get(raw, raw)
-            qb = qb.gte(col, v)
-        elif k.startswith("max_"):
-            raw = k[4:]
-            col = field_map.get(raw, raw)
-            qb = qb.lte(col, v)
-        else:
-            col = field_map.get(k, k)
-            qb = qb.eq(col, v)
-
-    qb = qb.limit(limit).offset(offset)
-    resp = qb.execute()
-    return resp.data or []
+    while True:
+        await asyncio.sleep(settings.CATALOG_CACHE_MAX_AGE)
+        if not snapshot.is_loaded():
+            await refresh_catalog_version()
+
+
+@on_catalog_change
+def _refresh_snapshot(rows: Optional[List[dict]]) -> None:
+    if rows is not None:
+        if snapshot.is_loaded():
+            for row in rows:
+                snapshot.upsert(row)
+        return
+    # No sabemos qué cambió: recargar todo (o sólo la versión) en segundo plano
+    try:
+        task = asyncio.get_running_loop().create_task(
+            load_snapshot() if snapshot.is_loaded() else refresh_catalog_version()
+        )
+    except RuntimeError:
+        logger.warning("Sin event loop activo: no se pudo recargar el snapshot")
+        return
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def search_alimentos(
+    filters: Dict[str, Any],
+    limit: int = 100,
+    offset: int = 0,
+    after: Optional[int] = None,
+) -> List[dict]:
+    # Camino rápido: máscaras sobre el snapshot en memoria
+    cached = snapshot.search(filters, limit=limit, offset=offset, after=after)
+    if cached is not None:
+        return cached
+
+    return await _call(lambda: get_backend().search_alimentos(filters, limit=limit, offset=offset, after=after))
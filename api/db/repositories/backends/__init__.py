@@ -0,0 +1,53 @@
+"""
+Selección del backend del repositorio de alimentos según REPO_BACKEND
+(supabase | sql | memory).
+"""
+
+import threading
+from typing import Optional
+
+from api.config import settings
+from .base import AlimentoBackend
+from .memory import MemoryBackend
+from .sql import SQLBackend
+from .supabase import SupabaseBackend
+
+_BACKENDS = {
+    "supabase": SupabaseBackend,
+    "sql": SQLBackend,
+    "memory": MemoryBackend,
+}
+
+_backend: Optional[AlimentoBackend] = None
+_lock = threading.Lock()
+
+
+def get_backend() -> AlimentoBackend:
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                nombre = settings.REPO_BACKEND.lower()
+                if nombre not in _BACKENDS:
+                    raise RuntimeError(f"REPO_BACKEND inválido: {settings.REPO_BACKEND} (supabase | sql | memory)")
+                _backend = _BACKENDS[nombre]()
+    return _backend
+
+
+def set_backend(backend: Optional[AlimentoBackend]) -> None:
+    """
+    Reemplaza el backend activo (tests y benchmarks). None vuelve a leer REPO_BACKEND.
+    """
+    global _backend
+    with _lock:
+        _backend = backend
+
+
+__all__ = [
+    "AlimentoBackend",
+    "MemoryBackend",
+    "SQLBackend",
+    "SupabaseBackend",
+    "get_backend",
+    "set_backend",
+]
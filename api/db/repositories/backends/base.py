@@ -0,0 +1,54 @@
+"""
+Interfaz de los backends del repositorio de alimentos.
+
+alimento_repo resuelve lo que puede desde el snapshot en memoria y delega el resto
+(lecturas que no están en memoria y todas las escrituras) en el backend elegido con
+REPO_BACKEND. Todas las listas se devuelven ordenadas por codigomex2, y `after`
+pagina por keyset (codigomex2 > after).
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class AlimentoBackend(ABC):
+    name: str = ""
+
+    def is_configured(self) -> bool:
+        return True
+
+    @abstractmethod
+    async def ping(self) -> None:
+        """Consulta mínima contra la fuente; lanza si no responde."""
+
+    @abstractmethod
+    async def get_all(self, limit: int = 100, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def get_by_codigo(self, codigo: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def get_by_codigos(self, codigos: List[int]) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def search_by_nombre(self, nombre: str, limit: int = 50, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        """Nombres que contienen `nombre` (sin distinguir mayúsculas)."""
+
+    @abstractmethod
+    async def search_alimentos(self, filters: Dict[str, Any], limit: int = 100, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        """Filtros min_/max_/igualdad sobre columnas (nombres de AlimentoFilter ya mapeables)."""
+
+    @abstractmethod
+    async def insert_alimento(self, obj: dict) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, rows: List[dict]) -> List[Tuple[int, str]]:
+        """Inserta un lote; devuelve [(indice_en_el_lote, error)] de las filas que fallaron."""
+
+    @abstractmethod
+    async def fetch_all_rows(self) -> List[dict]:
+        ...
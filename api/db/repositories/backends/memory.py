@@ -0,0 +1,87 @@
+"""
+Backend en memoria (tests y benchmarks): una lista de dicts ordenada por código.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.db.snapshot import FILTER_FIELD_MAP
+from .base import AlimentoBackend
+
+
+class MemoryBackend(AlimentoBackend):
+    name = "memory"
+
+    def __init__(self, rows: Optional[List[dict]] = None):
+        self._rows: Dict[int, dict] = {}
+        for row in rows or []:
+            self._rows[int(row["codigomex2"])] = dict(row)
+
+    def _ordenadas(self) -> List[dict]:
+        return [self._rows[c] for c in sorted(self._rows)]
+
+    @staticmethod
+    def _page(rows: List[dict], limit: int, offset: int, after: Optional[int]) -> List[dict]:
+        if after is not None:
+            rows = [r for r in rows if r["codigomex2"] > after]
+            offset = 0
+        return [dict(r) for r in rows[offset:offset + limit]]
+
+    async def ping(self) -> None:
+        return None
+
+    async def get_all(self, limit: int = 100, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        return self._page(self._ordenadas(), limit, offset, after)
+
+    async def get_by_codigo(self, codigo: int) -> Optional[dict]:
+        row = self._rows.get(int(codigo))
+        return dict(row) if row else None
+
+    async def get_by_codigos(self, codigos: List[int]) -> List[dict]:
+        return [dict(self._rows[c]) for c in sorted(set(codigos)) if c in self._rows]
+
+    async def search_by_nombre(self, nombre: str, limit: int = 50, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        rx = re.compile(re.escape(nombre), re.IGNORECASE)
+        rows = [r for r in self._ordenadas() if rx.search(r.get("nombre_del_alimento") or "")]
+        return self._page(rows, limit, offset, after)
+
+    async def search_alimentos(self, filters: Dict[str, Any], limit: int = 100, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        def ok(row: dict) -> bool:
+            for k, v in filters.items():
+                if v is None:
+                    continue
+                if k.startswith("min_") or k.startswith("max_"):
+                    valor = row.get(FILTER_FIELD_MAP.get(k[4:], k[4:]))
+                    # Igual que en SQL: los nulos no pasan ningún filtro
+                    if valor is None or (valor < v if k.startswith("min_") else valor > v):
+                        return False
+                elif row.get(FILTER_FIELD_MAP.get(k, k)) != v:
+                    return False
+            return True
+
+        return self._page([r for r in self._ordenadas() if ok(r)], limit, offset, after)
+
+    def _insert(self, obj: dict) -> dict:
+        row = dict(obj)
+        if row.get("codigomex2") is None:
+            row["codigomex2"] = max(self._rows, default=0) + 1
+        codigo = int(row["codigomex2"])
+        if codigo in self._rows:
+            raise ValueError(f"codigomex2 {codigo} ya existe")
+        self._rows[codigo] = row
+        return dict(row)
+
+    async def insert_alimento(self, obj: dict) -> Optional[dict]:
+        return self._insert(obj)
+
+    async def insert_many(self, rows: List[dict]) -> List[Tuple[int, str]]:
+        errores: List[Tuple[int, str]] = []
+        for i, row in enumerate(rows):
+            try:
+                self._insert(row)
+            except ValueError as e:
+                errores.append((i, str(e)))
+        return errores
+
+    async def fetch_all_rows(self) -> List[dict]:
+        return [dict(r) for r in self._ordenadas()]
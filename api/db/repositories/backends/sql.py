@@ -0,0 +1,118 @@
+"""
+Backend SQL directo sobre el pool async de SQLAlchemy (DATABASE_URL, asyncpg).
+
+Evita el salto HTTPS de PostgREST: cada lectura es una consulta sobre una conexión
+ya abierta del pool (DB_POOL_SIZE / DB_MAX_OVERFLOW).
+"""
+
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from api.db.models.alimento_model import Alimento
+from api.db.session import get_async_engine
+from api.db.snapshot import FILTER_FIELD_MAP
+from api.db.sql import _normalize_row, copy_records, insert_row
+from api.metrics import DB_QUERY, observe
+from .base import AlimentoBackend
+
+logger = logging.getLogger(__name__)
+
+TABLE = Alimento.__table__
+
+
+def _page(stmt, limit: int, offset: int, after: Optional[int]):
+    stmt = stmt.order_by(TABLE.c.codigomex2).limit(limit)
+    if after is not None:
+        return stmt.where(TABLE.c.codigomex2 > after)
+    return stmt.offset(offset)
+
+
+def _copy_value(v: Any) -> Any:
+    # COPY binario: las columnas numeric esperan Decimal
+    return Decimal(str(v)) if isinstance(v, float) else v
+
+
+class SQLBackend(AlimentoBackend):
+    name = "sql"
+
+    def is_configured(self) -> bool:
+        return get_async_engine() is not None
+
+    def _engine(self) -> AsyncEngine:
+        engine = get_async_engine()
+        if engine is None:
+            raise RuntimeError("DATABASE_URL no configurada: no se puede usar REPO_BACKEND=sql")
+        return engine
+
+    async def _fetch(self, stmt) -> List[dict]:
+        with observe(DB_QUERY):
+            async with self._engine().connect() as conn:
+                result = await conn.execute(stmt)
+                return [_normalize_row(dict(r)) for r in result.mappings().all()]
+
+    async def ping(self) -> None:
+        async with self._engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def get_all(self, limit: int = 100, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        return await self._fetch(_page(select(TABLE), limit, offset, after))
+
+    async def get_by_codigo(self, codigo: int) -> Optional[dict]:
+        rows = await self._fetch(select(TABLE).where(TABLE.c.codigomex2 == codigo).limit(1))
+        return rows[0] if rows else None
+
+    async def get_by_codigos(self, codigos: List[int]) -> List[dict]:
+        if not codigos:
+            return []
+        return await self._fetch(select(TABLE).where(TABLE.c.codigomex2.in_(codigos)))
+
+    async def search_by_nombre(self, nombre: str, limit: int = 50, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        stmt = select(TABLE).where(TABLE.c.nombre_del_alimento.ilike(f"%{nombre}%"))
+        return await self._fetch(_page(stmt, limit, offset, after))
+
+    async def search_alimentos(self, filters: Dict[str, Any], limit: int = 100, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        stmt = select(TABLE)
+        for k, v in filters.items():
+            if v is None:
+                continue
+            if k.startswith("min_"):
+                stmt = stmt.where(TABLE.c[FILTER_FIELD_MAP.get(k[4:], k[4:])] >= v)
+            elif k.startswith("max_"):
+                stmt = stmt.where(TABLE.c[FILTER_FIELD_MAP.get(k[4:], k[4:])] <= v)
+            else:
+                stmt = stmt.where(TABLE.c[FILTER_FIELD_MAP.get(k, k)] == v)
+        return await self._fetch(_page(stmt, limit, offset, after))
+
+    async def insert_alimento(self, obj: dict) -> Optional[dict]:
+        with observe(DB_QUERY):
+            async with self._engine().begin() as conn:
+                result = await conn.execute(insert(TABLE).values(**obj).returning(*TABLE.c))
+                row = result.mappings().first()
+        return _normalize_row(dict(row)) if row else None
+
+    async def insert_many(self, rows: List[dict]) -> List[Tuple[int, str]]:
+        errores: List[Tuple[int, str]] = []
+        # COPY necesita las mismas columnas en todo el lote: se agrupa por conjunto de claves
+        grupos: Dict[Tuple[str, ...], List[int]] = {}
+        for i, row in enumerate(rows):
+            grupos.setdefault(tuple(row), []).append(i)
+        for columnas, indices in grupos.items():
+            records = [tuple(_copy_value(rows[i][c]) for c in columnas) for i in indices]
+            try:
+                await copy_records(TABLE.name, list(columnas), records)
+                continue
+            except Exception as e:
+                logger.warning("COPY de %d filas falló (%s); se reintenta fila por fila", len(records), e)
+            for i in indices:
+                try:
+                    await insert_row(TABLE.name, rows[i])
+                except Exception as e:
+                    errores.append((i, str(getattr(e, "orig", e))))
+        return errores
+
+    async def fetch_all_rows(self) -> List[dict]:
+        return await self._fetch(select(TABLE).order_by(TABLE.c.codigomex2))
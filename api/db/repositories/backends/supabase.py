@@ -0,0 +1,127 @@
+"""
+Backend PostgREST (cliente async de Supabase).
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.config import settings
+from api.db.connection import get_supabase
+from api.db.snapshot import FILTER_FIELD_MAP
+from api.metrics import SUPABASE_LATENCY, observe
+from .base import AlimentoBackend
+
+logger = logging.getLogger(__name__)
+
+TABLE = "alimentos"
+
+# PostgREST corta las respuestas en 1000 filas por defecto
+_PAGE_SIZE = 1000
+
+
+async def _execute(query, funcion: str):
+    # Latencia de PostgREST por función del repositorio
+    with observe(SUPABASE_LATENCY, function=funcion):
+        return await query.execute()
+
+
+def _page(qb, limit: int, offset: int, after: Optional[int]):
+    # Orden por código en ambos modos, el mismo que usa el snapshot
+    if after is not None:
+        return qb.gt("codigomex2", after).order("codigomex2").limit(limit)
+    return qb.order("codigomex2").limit(limit).offset(offset)
+
+
+class SupabaseBackend(AlimentoBackend):
+    name = "supabase"
+
+    def is_configured(self) -> bool:
+        return bool(settings.SUPABASE_URL and settings.SUPABASE_SERVICE_KEY)
+
+    async def _table(self):
+        client = await get_supabase()
+        if client is None:
+            raise RuntimeError("Supabase no configurado (SUPABASE_URL / SUPABASE_SERVICE_KEY)")
+        return client.table(TABLE)
+
+    async def ping(self) -> None:
+        await _execute((await self._table()).select("codigomex2").limit(1), "ping")
+
+    async def get_all(self, limit: int = 100, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        resp = await _execute(_page((await self._table()).select("*"), limit, offset, after), "get_all")
+        # resp es un dict-like, se accede como atributo o clave
+        return resp.data or []
+
+    async def get_by_codigo(self, codigo: int) -> Optional[dict]:
+        resp = await _execute((await self._table()).select("*").eq("codigomex2", codigo).limit(1), "get_by_codigo")
+        return resp.data[0] if resp.data else None
+
+    async def get_by_codigos(self, codigos: List[int]) -> List[dict]:
+        if not codigos:
+            return []
+        resp = await _execute((await self._table()).select("*").in_("codigomex2", codigos), "get_by_codigos")
+        return resp.data or []
+
+    async def search_by_nombre(self, nombre: str, limit: int = 50, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        qb = (await self._table()).select("*").ilike("nombre_del_alimento", f"%{nombre}%")
+        resp = await _execute(_page(qb, limit, offset, after), "search_by_nombre")
+        return resp.data or []
+
+    async def search_alimentos(self, filters: Dict[str, Any], limit: int = 100, offset: int = 0, after: Optional[int] = None) -> List[dict]:
+        qb = (await self._table()).select("*")
+        for k, v in filters.items():
+            if v is None:
+                continue
+            if k.startswith("min_"):
+                raw = k[4:]
+                col = FILTER_FIELD_MAP.get(raw, raw)
+                qb = qb.gte(col, v)
+            elif k.startswith("max_"):
+                raw = k[4:]
+                col = FILTER_FIELD_MAP.get(raw, raw)
+                qb = qb.lte(col, v)
+            else:
+                col = FILTER_FIELD_MAP.get(k, k)
+                qb = qb.eq(col, v)
+        resp = await _execute(_page(qb, limit, offset, after), "search_alimentos")
+        return resp.data or []
+
+    async def insert_alimento(self, obj: dict) -> Optional[dict]:
+        resp = await _execute((await self._table()).insert(obj), "insert_alimento")
+        return resp.data[0] if resp.data else None
+
+    async def insert_many(self, rows: List[dict]) -> List[Tuple[int, str]]:
+        table = await self._table()
+        try:
+            await _execute(table.insert(rows), "insert_alimentos_bulk")
+            return []
+        except Exception as e:
+            logger.warning("Insert por lote en Supabase falló (%s); se reintenta fila por fila", e)
+        errores: List[Tuple[int, str]] = []
+        for i, row in enumerate(rows):
+            try:
+                await _execute(table.insert(row), "insert_alimentos_bulk")
+            except Exception as e:
+                errores.append((i, str(e)))
+        return errores
+
+    async def fetch_all_rows(self) -> List[dict]:
+        """
+        Trae la tabla completa paginando de a _PAGE_SIZE (para armar el snapshot).
+        """
+        table = await self._table()
+        rows: List[dict] = []
+        offset = 0
+        while True:
+            resp = await _execute(
+                table
+                .select("*")
+                .order("codigomex2")
+                .range(offset, offset + _PAGE_SIZE - 1),
+                "fetch_all_rows",
+            )
+            page = resp.data or []
+            rows.extend(page)
+            if len(page) < _PAGE_SIZE:
+                return rows
+            offset += _PAGE_SIZE
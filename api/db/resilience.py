@@ -0,0 +1,178 @@
+"""
+Resiliencia frente a caídas de la DB: backoff exponencial con jitter y circuit breaker.
+
+- Los reintentos esperan con asyncio.sleep (no bloquean el event loop ni un worker)
+  y sólo se hacen ante fallas transitorias (conexión, timeout, red).
+- El breaker se abre tras BREAKER_FAILURE_THRESHOLD fallas transitorias seguidas y
+  durante BREAKER_RESET_SECONDS rechaza al instante con CircuitOpenError; después
+  deja pasar una llamada de prueba (half-open) que lo cierra o lo vuelve a abrir.
+  Si la prueba se cancela (el cliente cortó, venció un timeout externo) no cuenta
+  como éxito ni como falla: sólo libera el lugar para la próxima prueba.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+import httpx
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from api.config import settings
+from api.metrics import BREAKER_OPEN
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    # RuntimeError: las rutas ya lo traducen a 503
+    pass
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Fallas de infraestructura (vale la pena reintentar y cuentan para el breaker).
+    Un SQL inválido o una violación de constraint no lo son.
+    """
+    if isinstance(exc, DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(
+        exc,
+        (OperationalError, InterfaceError, OSError, asyncio.TimeoutError, httpx.TransportError),
+    )
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    "Full jitter": uniforme entre 0 y base * 2**attempt (con tope), para que los
+    reintentos de muchos requests no lleguen todos juntos.
+    """
+    techo = min(settings.DB_RETRY_MAX_DELAY, settings.DB_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, techo)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+        BREAKER_OPEN.labels(name=name).set(0)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self) -> bool:
+        """
+        Lanza CircuitOpenError si el breaker no deja pasar la llamada; devuelve True
+        si la llamada es la prueba half-open.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probing:
+                # Una sola llamada de prueba a la vez
+                self._probing = True
+                return True
+            self.rejected += 1
+        raise CircuitOpenError(f"Circuito '{self.name}' abierto: la base de datos no está respondiendo")
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Circuito '%s' cerrado", self.name)
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+        BREAKER_OPEN.labels(name=self.name).set(0)
+
+    def on_failure(self, exc: BaseException) -> None:
+        if not is_transient(exc):
+            # La DB respondió (con un error propio de la consulta)
+            self.on_success()
+            return
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning("Circuito '%s' abierto tras %d fallas: %s", self.name, self._failures, exc)
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+        if self._state == OPEN:
+            BREAKER_OPEN.labels(name=self.name).set(1)
+
+    def on_cancel(self, probe: bool) -> None:
+        """
+        La llamada no terminó (CancelledError): no dice nada de la DB. Si era la
+        prueba half-open, libera el lugar para la siguiente.
+        """
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "rejected": self.rejected,
+        }
+
+
+async def call_with_resilience(
+    fn: Callable[[], Awaitable[T]],
+    breaker: CircuitBreaker,
+    retries: int = 3,
+    on_retry: Callable[[], None] = lambda: None,
+) -> T:
+    """
+    Ejecuta fn() pasando por el breaker y reintenta las fallas transitorias con backoff.
+    """
+    for attempt in range(retries):
+        probe = breaker.before_call()
+        try:
+            result = await fn()
+        except Exception as e:
+            breaker.on_failure(e)
+            if not is_transient(e) or attempt == retries - 1:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("Falla transitoria en '%s' (intento %d/%d): %s; reintento en %.2fs", breaker.name, attempt + 1, retries, e, delay)
+            on_retry()
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Cancelación: sin esto una prueba half-open cancelada deja _probing
+            # en True y el breaker rechaza para siempre
+            breaker.on_cancel(probe)
+            raise
+        breaker.on_success()
+        return result
+    raise RuntimeError("sin intentos")  # retries <= 0
+
+
+db_breaker = CircuitBreaker("db", settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS)
+repo_breaker = CircuitBreaker("repo", settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS)
+
+
+def breakers_stats() -> Dict[str, Dict[str, Any]]:
+    return {b.name: b.stats() for b in (db_breaker, repo_breaker)}
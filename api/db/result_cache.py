@@ -0,0 +1,112 @@
+"""
+Cache acotado de resultados de execute_sql.
+
+La clave es el texto SQL más los parámetros. El tamaño de cada entrada se estima
+al guardarla y el cache desaloja por LRU hasta entrar en el presupuesto de memoria.
+Se vacía entero cuando cambia el catálogo.
+
+Cada invalidación avanza `generation`: el llamador la toma antes de consultar y la
+pasa a set(), que descarta las filas leídas antes de una invalidación. get() y
+set() copian las filas (dicts de valores escalares) para que nadie modifique lo
+que quedó en el cache.
+"""
+
+import json
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.config import settings
+from api.db.catalog import on_catalog_change
+
+
+def _estimate_size(rows: List[Dict[str, Any]]) -> int:
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for k, v in row.items():
+            size += sys.getsizeof(k) + sys.getsizeof(v)
+    return size
+
+
+def make_key(sql: str, params: Optional[dict] = None) -> str:
+    if not params:
+        return sql
+    return sql + "\x00" + json.dumps(params, sort_keys=True, default=str)
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # clave -> (filas, tamaño estimado)
+        self._entries: "OrderedDict[str, Tuple[List[Dict[str, Any]], int]]" = OrderedDict()
+        self._bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(row) for row in item[0]]
+
+    def set(self, key: str, rows: List[Dict[str, Any]], generation: Optional[int] = None) -> None:
+        """
+        `generation` es la que tenía el cache al empezar la consulta; si hubo una
+        invalidación en el medio las filas pueden estar viejas y no se guardan.
+        """
+        size = _estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        rows = [dict(row) for row in rows]
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (rows, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+result_cache: Optional[ResultCache] = None
+if settings.RESULT_CACHE_ENABLED:
+    result_cache = ResultCache(settings.RESULT_CACHE_MAX_BYTES)
+
+    @on_catalog_change
+    def _invalidate_results(rows: Optional[List[dict]]) -> None:
+        result_cache.clear()
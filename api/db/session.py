@@ -1,22 +1,76 @@
+import threading
 from typing import Generator, Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from api.config import settings
 
 ENGINE = None
+ASYNC_ENGINE: Optional[AsyncEngine] = None
 SessionLocal: Optional[sessionmaker] = None
+_initialized = False
+_init_lock = threading.Lock()
+
+
+def _async_url(url: str):
+    """
+    Convierte DATABASE_URL (postgresql://, postgres://, postgresql+psycopg2://) al driver asyncpg.
+    asyncpg no entiende `sslmode`, así que se traduce a `ssl`.
+    """
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    u = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(u.query)
+    sslmode = query.pop("sslmode", None)
+    if sslmode and "ssl" not in query:
+        query["ssl"] = sslmode
+    return u.set(query=query)
+
+
+def _init() -> None:
+    """
+    Crea los engines en el primer uso (no al importar el módulo): el import de la app
+    queda barato y el arranque en frío no paga el driver si no se usa.
+    """
+    global ENGINE, ASYNC_ENGINE, SessionLocal, _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        if settings.DATABASE_URL:
+            ENGINE = create_engine(
+                settings.DATABASE_URL,
+                future=True,
+                pool_pre_ping=settings.DB_POOL_PRE_PING,
+                pool_recycle=settings.DB_POOL_RECYCLE,
+            )
+            SessionLocal = sessionmaker(bind=ENGINE, autoflush=False, autocommit=False, future=True)
+            # Pool async para execute_sql (las rutas son async y no deben bloquear el event loop)
+            ASYNC_ENGINE = create_async_engine(
+                _async_url(settings.DATABASE_URL),
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_pre_ping=settings.DB_POOL_PRE_PING,
+                pool_recycle=settings.DB_POOL_RECYCLE,
+            )
+        _initialized = True
 
-if settings.DATABASE_URL:
-    ENGINE = create_engine(settings.DATABASE_URL, future=True)
-    SessionLocal = sessionmaker(bind=ENGINE, autoflush=False, autocommit=False, future=True)
 
 def get_engine():
+    _init()
     return ENGINE
 
+def get_async_engine() -> Optional[AsyncEngine]:
+    _init()
+    return ASYNC_ENGINE
+
 def get_db() -> Generator[Session, None, None]:
     """
     Dependencia para FastAPI: yield a SQLAlchemy Session
     """
+    _init()
     if SessionLocal is None:
         raise RuntimeError("DATABASE_URL no configurada")
     db = SessionLocal()
@@ -0,0 +1,147 @@
+"""
+Índice de similitud nutricional (vecinos más cercanos) sobre las columnas numéricas.
+
+La matriz se normaliza por columna (z-score, ignorando NaN). La distancia entre dos
+alimentos es la raíz del promedio ponderado de diferencias al cuadrado, calculada
+sólo sobre los nutrientes que ambos tienen cargados. El top-k sale de un
+argpartition, sin ordenar la tabla completa.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.db.catalog import on_catalog_change
+from api.db.snapshot import NUMERIC_COLUMNS, snapshot
+
+# Mínimo de nutrientes en común para que la distancia tenga sentido
+MIN_NUTRIENTES_COMUNES = 3
+
+
+def _row_vector(row: dict) -> np.ndarray:
+    return np.array(
+        [np.nan if row.get(c) is None else float(row[c]) for c in NUMERIC_COLUMNS],
+        dtype=np.float64,
+    )
+
+
+class NutrientIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.codigos = np.empty(0, dtype=np.int64)
+        self._raw = np.empty((0, len(NUMERIC_COLUMNS)), dtype=np.float64)
+        self._norm = self._raw
+        self._set_derived()
+        # Versión de carga completa del snapshot desde la que se construyó
+        self.source_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def _set_derived(self) -> None:
+        # Matrices precalculadas para que la distancia sean unos pocos productos matriz-vector
+        present = ~np.isnan(self._norm)
+        self._present = present.astype(np.float64)
+        self._filled = np.where(present, self._norm, 0.0)
+        self._filled_sq = self._filled * self._filled
+
+    def _normalize(self) -> None:
+        raw = self._raw
+        if raw.shape[0] == 0:
+            self._norm = raw
+            self._set_derived()
+            return
+        with np.errstate(all="ignore"):
+            media = np.nanmean(raw, axis=0)
+            desvio = np.nanstd(raw, axis=0)
+        media = np.where(np.isnan(media), 0.0, media)
+        desvio = np.where(np.isnan(desvio) | (desvio == 0), 1.0, desvio)
+        self._norm = (raw - media) / desvio
+        self._set_derived()
+
+    def build(self, codigos: np.ndarray, columnas: Dict[str, np.ndarray], version: Optional[int] = None) -> None:
+        raw = np.column_stack([columnas[c] for c in NUMERIC_COLUMNS]) if len(codigos) else np.empty((0, len(NUMERIC_COLUMNS)))
+        with self._lock:
+            self.codigos = np.asarray(codigos, dtype=np.int64).copy()
+            self._raw = raw.astype(np.float64, copy=True)
+            self._normalize()
+            self.source_version = version
+
+    def upsert(self, rows: List[dict]) -> None:
+        """
+        Actualización incremental: reemplaza o inserta las filas (manteniendo el orden
+        por código) y recalcula la normalización, sin reconstruir desde la fuente.
+        """
+        with self._lock:
+            for row in rows:
+                if row.get("codigomex2") is None:
+                    continue
+                codigo = int(row["codigomex2"])
+                vec = _row_vector(row)
+                pos = int(np.searchsorted(self.codigos, codigo))
+                if pos < len(self.codigos) and self.codigos[pos] == codigo:
+                    self._raw[pos] = vec
+                else:
+                    self.codigos = np.insert(self.codigos, pos, codigo)
+                    self._raw = np.insert(self._raw, pos, vec, axis=0)
+            self._normalize()
+
+    def weights(self, pesos: Optional[Dict[str, float]] = None) -> np.ndarray:
+        w = np.ones(len(NUMERIC_COLUMNS), dtype=np.float64)
+        for col, peso in (pesos or {}).items():
+            w[NUMERIC_COLUMNS.index(col)] = peso
+        return w
+
+    def nearest(self, codigo: int, k: int = 10, pesos: Optional[Dict[str, float]] = None) -> Optional[List[Tuple[int, float]]]:
+        """
+        Devuelve [(codigo, distancia)] de los k más parecidos (sin incluir al propio),
+        o None si el código no está en el índice.
+        """
+        with self._lock:
+            codigos, present, filled, filled_sq = self.codigos, self._present, self._filled, self._filled_sq
+        pos = int(np.searchsorted(codigos, codigo))
+        if pos >= len(codigos) or codigos[pos] != codigo:
+            return None
+
+        # sum_j w_j*m_ij*(x_ij - q_j)^2 desarrollado, con m = presentes en ambos
+        q = filled[pos]
+        a = self.weights(pesos) * present[pos]
+        num = filled_sq @ a - 2.0 * (filled @ (a * q)) + present @ (a * q * q)
+        den = present @ a
+        comunes = present @ present[pos]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dist = np.sqrt(np.maximum(num, 0.0) / den)
+        dist[(comunes < MIN_NUTRIENTES_COMUNES) | (den <= 0)] = np.inf
+        dist[pos] = np.inf
+
+        candidatos = np.flatnonzero(np.isfinite(dist))
+        if candidatos.size == 0:
+            return []
+        k = min(k, candidatos.size)
+        top = candidatos[np.argpartition(dist[candidatos], k - 1)[:k]]
+        top = top[np.argsort(dist[top], kind="stable")]
+        return [(int(codigos[i]), float(dist[i])) for i in top]
+
+
+index = NutrientIndex()
+
+
+def get_index() -> Optional[NutrientIndex]:
+    """
+    Índice al día con el snapshot. Se reconstruye (vectorizado, desde los arrays
+    columnares) sólo cuando el snapshot se recargó entero.
+    """
+    data = snapshot.data()
+    if data is None:
+        return None
+    if index.source_version != snapshot.load_version:
+        index.build(data.codigos, data.columnas, version=snapshot.load_version)
+    return index
+
+
+@on_catalog_change
+def _update_index(rows: Optional[List[dict]]) -> None:
+    # Con rows None el snapshot se recarga entero y get_index reconstruye solo
+    if rows is not None and index.source_version is not None:
+        index.upsert(rows)
@@ -0,0 +1,212 @@
+"""
+Snapshot columnar en memoria de la tabla `alimentos`.
+
+La tabla es chica y casi no cambia, así que guardamos una copia por proceso:
+un array de numpy por cada columna nutricional, más los códigos y los nombres.
+Los filtros min_/max_ de /buscar se resuelven como máscaras vectorizadas sin
+tocar Supabase.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Numeric
+
+from api.db.models.alimento_model import Alimento
+from api.db.text_index import TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+# Columnas numéricas del modelo (energ_kcal, protein, ...)
+NUMERIC_COLUMNS: List[str] = [
+    c.name for c in Alimento.__table__.columns if isinstance(c.type, Numeric)
+]
+
+# Todas las columnas de la tabla, en orden
+COLUMNS: List[str] = ["codigomex2", "nombre_del_alimento"] + NUMERIC_COLUMNS
+
+# Nombres "amigables" que usa AlimentoFilter -> columna real
+FILTER_FIELD_MAP: Dict[str, str] = {
+    "calorias": "energ_kcal",
+    "carbohidratos": "carbohydrt",
+    "proteina": "protein",
+    "lipidos": "lipid_tot",
+}
+
+
+class _SnapshotData:
+    """
+    Estado inmutable del snapshot. Se reemplaza entero en cada recarga para que
+    los lectores nunca vean una mezcla de versiones.
+    """
+
+    def __init__(self, rows: List[dict]):
+        rows = sorted(rows, key=lambda r: int(r["codigomex2"]))
+        self.rows: List[dict] = rows
+        self.codigos = np.fromiter((int(r["codigomex2"]) for r in rows), dtype=np.int64, count=len(rows))
+        self.nombres = np.array([r.get("nombre_del_alimento") or "" for r in rows], dtype=object)
+        # None -> NaN, así las comparaciones descartan nulos igual que en SQL
+        self.columnas: Dict[str, np.ndarray] = {
+            col: np.array(
+                [np.nan if r.get(col) is None else float(r[col]) for r in rows],
+                dtype=np.float64,
+            )
+            for col in NUMERIC_COLUMNS
+        }
+        self.indice_nombres = TrigramIndex(self.nombres.tolist(), claves=self.codigos)
+        # Filas ya serializadas (posición -> bytes); mueren junto con este estado
+        self.blobs: Dict[int, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class AlimentosSnapshot:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Optional[_SnapshotData] = None
+        # Se incrementa en cada carga completa (no en los upserts)
+        self.load_version = 0
+
+    def is_loaded(self) -> bool:
+        return self._data is not None
+
+    def data(self) -> Optional[_SnapshotData]:
+        return self._data
+
+    def get(self, codigo: int) -> Optional[dict]:
+        data = self._data
+        if data is None:
+            return None
+        pos = int(np.searchsorted(data.codigos, codigo))
+        if pos < len(data) and data.codigos[pos] == codigo:
+            return data.rows[pos]
+        return None
+
+    def blob(self, row: dict, serializar: Callable[[dict], bytes]) -> Optional[bytes]:
+        """
+        Bytes serializados de una fila del snapshot, cacheados por fila.
+        Devuelve None si `row` no es el mismo objeto que guarda el snapshot.
+        """
+        data = self._data
+        if data is None or row.get("codigomex2") is None:
+            return None
+        pos = int(np.searchsorted(data.codigos, int(row["codigomex2"])))
+        if pos >= len(data) or data.rows[pos] is not row:
+            return None
+        cached = data.blobs.get(pos)
+        if cached is None:
+            cached = data.blobs[pos] = serializar(row)
+        return cached
+
+    def load(self, rows: List[dict]) -> None:
+        data = _SnapshotData(rows)
+        with self._lock:
+            self._data = data
+            self.load_version += 1
+        logger.info("Snapshot de alimentos cargado: %d filas", len(data))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data = None
+
+    def upsert(self, row: dict) -> None:
+        """
+        Agrega (o reemplaza) una fila luego de un insert. Reconstruye los arrays;
+        es O(n) pero las escrituras son raras.
+        """
+        if not row or row.get("codigomex2") is None:
+            return
+        with self._lock:
+            if self._data is None:
+                return
+            codigo = int(row["codigomex2"])
+            rows = [r for r in self._data.rows if int(r["codigomex2"]) != codigo]
+            rows.append(row)
+            self._data = _SnapshotData(rows)
+
+    def page(self, limit: int = 100, offset: int = 0, after: Optional[int] = None) -> Optional[List[dict]]:
+        """
+        Filas ordenadas por código. Con `after` pagina por keyset (codigomex2 > after)
+        y se ignora offset.
+        """
+        data = self._data
+        if data is None:
+            return None
+        start = offset if after is None else int(np.searchsorted(data.codigos, after, side="right"))
+        return data.rows[start:start + limit]
+
+    def search(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 100,
+        offset: int = 0,
+        after: Optional[int] = None,
+    ) -> Optional[List[dict]]:
+        """
+        Aplica los filtros como máscaras vectorizadas.
+        Con `after` pagina por keyset (codigomex2 > after) en lugar de por offset.
+        Devuelve None si el snapshot no está cargado o si algún filtro no se
+        puede resolver en memoria (el llamador cae a la DB).
+        """
+        data = self._data
+        if data is None:
+            return None
+
+        mask = np.ones(len(data), dtype=bool)
+        if after is not None:
+            # Las filas están ordenadas por código: todo lo anterior queda afuera
+            mask[:int(np.searchsorted(data.codigos, after, side="right"))] = False
+        for k, v in filters.items():
+            if v is None:
+                continue
+            if k.startswith("min_") or k.startswith("max_"):
+                col = FILTER_FIELD_MAP.get(k[4:], k[4:])
+                arr = data.columnas.get(col)
+                if arr is None:
+                    return None
+                mask &= (arr >= float(v)) if k.startswith("min_") else (arr <= float(v))
+            else:
+                col = FILTER_FIELD_MAP.get(k, k)
+                if col in data.columnas:
+                    mask &= data.columnas[col] == float(v)
+                elif col == "codigomex2":
+                    mask &= data.codigos == int(v)
+                elif col == "nombre_del_alimento":
+                    mask &= data.nombres == v
+                else:
+                    return None
+
+        idx = np.flatnonzero(mask)[offset:offset + limit]
+        return [data.rows[i] for i in idx]
+
+    def search_nombre(self, nombre: str, limit: int = 50, offset: int = 0) -> Optional[List[dict]]:
+        """
+        Búsqueda por substring del nombre (sin acentos ni mayúsculas) usando el
+        índice de trigramas. Devuelve None si el snapshot no está cargado.
+        """
+        hits = self.search_nombre_claves(nombre, limit=limit, offset=offset)
+        return None if hits is None else [row for _, row in hits]
+
+    def search_nombre_claves(
+        self,
+        nombre: str,
+        limit: int = 50,
+        offset: int = 0,
+        after: Optional[Sequence[int]] = None,
+    ) -> Optional[List[Tuple[Tuple[int, int, int, int], dict]]]:
+        """
+        Como search_nombre pero devuelve también la clave de relevancia de cada fila,
+        que sirve de cursor para pedir la página siguiente con `after`.
+        """
+        data = self._data
+        if data is None:
+            return None
+        hits = data.indice_nombres.search(nombre, top=offset + limit, after=after)[offset:offset + limit]
+        return [(clave, data.rows[i]) for clave, i in hits]
+
+
+# Instancia única por proceso
+snapshot = AlimentosSnapshot()
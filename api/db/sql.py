@@ -1,9 +1,13 @@
 from decimal import Decimal
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from sqlalchemy import text
-from api.db.session import get_engine
+from api.db.session import get_async_engine
+from api.db.result_cache import result_cache, make_key
+from api.config import settings
+from api.metrics import DB_QUERY, DB_RETRIES, observe
+from api.db.resilience import CircuitOpenError, call_with_resilience, db_breaker
+import json
 import logging
-import time
 
 logger = logging.getLogger(__name__)
 
@@ -19,33 +23,103 @@ def _normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
             out[k] = v
     return out
 
-def execute_sql(sql: str, params: Optional[dict] = None, max_retries: int = 3) -> List[Dict[str, Any]]:
+async def execute_sql(sql: str, params: Optional[dict] = None, max_retries: int = 3, use_cache: bool = True) -> List[Dict[str, Any]]:
     """
-    Ejecuta SQL con reintentos, usando el mismo engine que otros endpoints exitosos.
+    Ejecuta SQL sobre el pool async (asyncpg), con reintentos y circuit breaker (api.db.resilience).
+    Los SELECT se cachean en result_cache (se invalida cuando cambia el catálogo).
     """
-    engine = get_engine()
+    cache_key = None
+    if use_cache and result_cache is not None and sql.lstrip()[:6].lower() == "select":
+        cache_key = make_key(sql, params)
+        # Antes de consultar: si el catálogo cambia mientras tanto, set() descarta las filas
+        generation = result_cache.generation
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"SQL result served from cache, {len(cached)} rows")
+            return cached
+
+    engine = get_async_engine()
     if engine is None:
         raise RuntimeError("DATABASE_URL no configurada: no se puede ejecutar SQL directo.")
 
-    for attempt in range(max_retries):
-        try:
-            # Usar una nueva conexión para cada intento
-            with engine.connect() as conn:
+    async def _run() -> List[Dict[str, Any]]:
+        # Tomar una conexión del pool en cada intento
+        with observe(DB_QUERY):
+            async with engine.connect() as conn:
+                # Tope por sentencia: SET LOCAL vale sólo para esta transacción
+                await conn.execute(text(f"SET LOCAL statement_timeout = {int(settings.SQL_STATEMENT_TIMEOUT_MS)}"))
                 if params:
-                    result = conn.execute(text(sql), params)
+                    result = await conn.execute(text(sql), params)
                 else:
-                    result = conn.execute(text(sql))
-                
-                rows = [_normalize_row(dict(r)) for r in result.mappings().all()]
-                logger.info(f"SQL executed successfully on attempt {attempt + 1}, returned {len(rows)} rows")
-                return rows
-                
-        except Exception as e:
-            logger.warning(f"SQL execution attempt {attempt + 1}/{max_retries} failed: {str(e)}")
-            
-            if attempt == max_retries - 1:  # Último intento
-                logger.error(f"SQL execution failed after {max_retries} attempts")
-                raise RuntimeError("Error ejecutando la consulta SQL.") from e
-            
-            # Esperar antes del siguiente intento
-            time.sleep(1.0 * (attempt + 1))  # 1s, 2s, 3s...
\ No newline at end of file
+                    result = await conn.execute(text(sql))
+                return [_normalize_row(dict(r)) for r in result.mappings().all()]
+
+    # Reintenta sólo fallas transitorias, con backoff y jitter; con el breaker abierto falla al instante
+    try:
+        rows = await call_with_resilience(_run, db_breaker, retries=max_retries, on_retry=DB_RETRIES.inc)
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logger.error(f"SQL execution failed: {str(e)}")
+        raise RuntimeError("Error ejecutando la consulta SQL.") from e
+
+    logger.info(f"SQL executed successfully, returned {len(rows)} rows")
+    if cache_key is not None:
+        result_cache.set(cache_key, rows, generation=generation)
+    return rows
+
+
+async def explain_cost(sql: str, params: Optional[dict] = None) -> float:
+    """
+    Devuelve el "Total Cost" que estima el planner de Postgres para `sql` (sin ejecutarla).
+    """
+    engine = get_async_engine()
+    if engine is None:
+        raise RuntimeError("DATABASE_URL no configurada: no se puede ejecutar SQL directo.")
+    async with engine.connect() as conn:
+        result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params or {})
+        plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return float(plan[0]["Plan"]["Total Cost"])
+
+
+async def stream_sql(sql: str, params: Optional[dict] = None, batch_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Recorre el resultado con un cursor del lado del servidor y va entregando lotes de
+    `batch_size` filas, sin materializar el resultado completo en memoria.
+    """
+    engine = get_async_engine()
+    if engine is None:
+        raise RuntimeError("DATABASE_URL no configurada: no se puede ejecutar SQL directo.")
+    async with engine.connect() as conn:
+        result = await conn.stream(text(sql), params or {}, execution_options={"yield_per": batch_size})
+        async for partition in result.mappings().partitions(batch_size):
+            yield [_normalize_row(dict(r)) for r in partition]
+
+
+async def copy_records(table: str, columns: List[str], records: List[tuple]) -> int:
+    """
+    Carga masiva con COPY (copy_records_to_table de asyncpg) sobre una conexión del pool.
+    Es una sola sentencia: si falla alguna fila no se inserta ninguna.
+    """
+    engine = get_async_engine()
+    if engine is None:
+        raise RuntimeError("DATABASE_URL no configurada: no se puede ejecutar SQL directo.")
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(table, records=records, columns=columns)
+    return len(records)
+
+
+async def insert_row(table: str, row: Dict[str, Any]) -> None:
+    """
+    INSERT de una sola fila en su propia transacción (para aislar las filas que fallan).
+    """
+    engine = get_async_engine()
+    if engine is None:
+        raise RuntimeError("DATABASE_URL no configurada: no se puede ejecutar SQL directo.")
+    cols = list(row)
+    sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(':' + c for c in cols)})"
+    async with engine.begin() as conn:
+        await conn.execute(text(sql), row)
@@ -0,0 +1,123 @@
+"""
+Índice invertido de trigramas sobre nombre_del_alimento.
+
+Reemplaza el `ilike '%nombre%'` contra Supabase en el autocompletado: los nombres
+se normalizan (sin acentos, en minúscula) y cada trigrama apunta a las filas que
+lo contienen. Los candidatos se verifican con una búsqueda de substring y se
+ordenan por relevancia.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_ESPACIOS = re.compile(r"\s+")
+
+
+def fold(texto: str) -> str:
+    """
+    Normaliza para comparar: sin acentos, minúsculas y espacios colapsados.
+    Ej: "ACEITE DE ALGODÓN" -> "aceite de algodon"
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_acentos = "".join(ch for ch in descompuesto if not unicodedata.combining(ch))
+    return _ESPACIOS.sub(" ", sin_acentos.casefold()).strip()
+
+
+def trigramas(texto: str) -> set:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _ngramas_cortos(texto: str) -> set:
+    # Unigramas y bigramas, para poder responder consultas de 1-2 caracteres
+    return {texto[i:i + n] for n in (1, 2) for i in range(len(texto) - n + 1)}
+
+
+class TrigramIndex:
+    def __init__(self, nombres: Sequence[str], claves: Optional[Sequence[int]] = None):
+        self.nombres: List[str] = [fold(n) for n in nombres]
+        postings: Dict[str, List[int]] = {}
+        for i, nombre in enumerate(self.nombres):
+            for tg in trigramas(nombre) | _ngramas_cortos(nombre):
+                postings.setdefault(tg, []).append(i)
+        # Las listas ya quedan ordenadas porque recorremos i en orden
+        self._postings: Dict[str, np.ndarray] = {
+            tg: np.array(ids, dtype=np.int64) for tg, ids in postings.items()
+        }
+        self._nombres_u = np.array(self.nombres, dtype=str)
+        self._largos = np.array([len(n) for n in self.nombres], dtype=np.int64)
+        # Desempate estable entre corridas (el codigomex2); por defecto la posición
+        if claves is None:
+            self._claves = np.arange(len(self.nombres), dtype=np.int64)
+        else:
+            self._claves = np.asarray(claves, dtype=np.int64)
+
+    def _candidatos(self, q: str) -> np.ndarray:
+        vacio = np.empty(0, dtype=np.int64)
+        if len(q) < 3:
+            # Consultas muy cortas: el propio q es un n-grama indexado
+            return self._postings.get(q, vacio)
+        listas = []
+        for tg in trigramas(q):
+            ids = self._postings.get(tg)
+            if ids is None:
+                return vacio
+            listas.append(ids)
+        listas.sort(key=len)
+        ids = listas[0]
+        for otra in listas[1:]:
+            ids = np.intersect1d(ids, otra, assume_unique=True)
+            if ids.size == 0:
+                break
+        return ids
+
+    def search(
+        self,
+        texto: str,
+        top: Optional[int] = None,
+        after: Optional[Sequence[int]] = None,
+    ) -> List[Tuple[Tuple[int, int, int, int], int]]:
+        """
+        Devuelve [(clave_de_relevancia, indice_de_fila)] ordenado por relevancia.
+        Clave (menor = mejor): nivel, posición de la coincidencia, largo del nombre y
+        clave de desempate, donde nivel 0 = nombre exacto, 1 = empieza con q,
+        2 = alguna palabra empieza con q, 3 = substring.
+        Con `top` sólo se devuelven los primeros `top` resultados; con `after` sólo
+        los que vienen estrictamente después de esa clave (paginación por keyset).
+        """
+        q = fold(texto)
+        if not q:
+            return []
+        ids = self._candidatos(q)
+        if ids.size == 0:
+            return []
+
+        # Verificación y ranking vectorizados sobre los candidatos
+        nombres = self._nombres_u[ids]
+        pos = np.char.find(nombres, q)
+        ok = pos >= 0
+        ids, nombres, pos = ids[ok], nombres[ok], pos[ok]
+        largos = self._largos[ids]
+        claves = self._claves[ids]
+        nivel = np.full(ids.size, 3, dtype=np.int64)
+        nivel[np.char.find(nombres, " " + q) >= 0] = 2
+        nivel[pos == 0] = 1
+        nivel[(pos == 0) & (largos == len(q))] = 0
+
+        if after is not None:
+            # Comparación lexicográfica (nivel, pos, largo, clave) > after
+            a_nivel, a_pos, a_largo, a_clave = after
+            sig = claves > a_clave
+            for col, v in ((largos, a_largo), (pos, a_pos), (nivel, a_nivel)):
+                sig = (col > v) | ((col == v) & sig)
+            ids, pos, largos, claves, nivel = ids[sig], pos[sig], largos[sig], claves[sig], nivel[sig]
+
+        orden = np.lexsort((claves, largos, pos, nivel))
+        if top is not None:
+            orden = orden[:top]
+        return [
+            ((int(nivel[j]), int(pos[j]), int(largos[j]), int(claves[j])), int(ids[j]))
+            for j in orden
+        ]
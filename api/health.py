@@ -0,0 +1,144 @@
+"""
+Monitor de salud en segundo plano.
+
+Cada HEALTH_CHECK_INTERVAL segundos chequea Supabase, el engine SQL directo y Gemini
+(los que estén configurados) y guarda el resultado. /health, /health/live y
+/health/ready responden desde ese cache: los probes del balanceador y de Kubernetes
+no generan consultas a la DB.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from api.config import settings
+from api.db.repositories.backends import SupabaseBackend, get_backend
+from api.db.session import get_async_engine
+from api.metrics import DEPENDENCY_UP
+from api.services.llm_gateway import gateway
+
+logger = logging.getLogger("health")
+
+# Dependencias sin las que el repositorio no puede responder, según REPO_BACKEND
+_CRITICAS = {"supabase": "supabase", "sql": "sql"}
+
+
+def _supabase() -> SupabaseBackend:
+    backend = get_backend()
+    return backend if isinstance(backend, SupabaseBackend) else SupabaseBackend()
+
+
+async def _check_supabase() -> None:
+    await _supabase().ping()
+
+
+async def _check_sql() -> None:
+    async with get_async_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def _check_gemini() -> None:
+    # Metadatos del modelo: confirma credenciales y red sin generar tokens
+    await gateway.client().aio.models.get(model="gemini-2.5-flash")
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    engine = get_async_engine()
+    if engine is None:
+        return None
+    pool = engine.sync_engine.pool
+    stats: Dict[str, Any] = {"status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats[name] = fn()
+    return stats
+
+
+class HealthMonitor:
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.started_at = time.time()
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.last_run: Optional[float] = None
+        # Pasa a True cuando termina el warm-up del arranque (api.startup)
+        self.warmed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def checks(self) -> Dict[str, Callable[[], Awaitable[None]]]:
+        checks: Dict[str, Callable[[], Awaitable[None]]] = {}
+        if _supabase().is_configured():
+            checks["supabase"] = _check_supabase
+        if get_async_engine() is not None:
+            checks["sql"] = _check_sql
+        if settings.GENAI_API_KEY:
+            checks["gemini"] = _check_gemini
+        return checks
+
+    async def _run_one(self, name: str, check: Callable[[], Awaitable[None]]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), timeout=self.timeout)
+            result = {"ok": True, "error": None}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        result["checked_at"] = time.time()
+        DEPENDENCY_UP.labels(name=name).set(1 if result["ok"] else 0)
+        if not result["ok"]:
+            logger.warning("Health check '%s' falló: %s", name, result["error"])
+        return result
+
+    async def run_checks(self) -> None:
+        checks = self.checks()
+        resultados = await asyncio.gather(*(self._run_one(n, c) for n, c in checks.items()))
+        self.results = dict(zip(checks, resultados))
+        self.last_run = time.time()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_checks()
+            except Exception:
+                logger.exception("Error en el monitor de salud")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def is_stale(self) -> bool:
+        # Si el loop murió los resultados dejan de valer
+        return self.last_run is None or time.time() - self.last_run > 3 * self.interval + self.timeout
+
+    def mark_warm(self) -> None:
+        self.warmed = True
+
+    def ready(self) -> bool:
+        if not self.warmed or self.is_stale():
+            return False
+        critica = _CRITICAS.get(get_backend().name)
+        return critica is None or self.results.get(critica, {}).get("ok", False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready(),
+            "warmed": self.warmed,
+            "backend": get_backend().name,
+            "checks": self.results,
+            "last_run": self.last_run,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "pool": pool_stats(),
+        }
+
+
+monitor = HealthMonitor(settings.HEALTH_CHECK_INTERVAL, settings.HEALTH_CHECK_TIMEOUT)
@@ -3,38 +3,59 @@ Main.py de la API
 Incluye:
 - Registro de routers (routes/alimentos.py, routes/asistente_ia.py y routes/receta_ia.py)
 - Handler para errores de RuntimeError (por ejemplo errores de DB lanzados en repo)
-- Endpoint /health que comprueba la conexión básica a la DB (para debug, principalmente)
+- Endpoints /health, /health/live y /health/ready servidos desde el monitor de salud en segundo plano
 - Configuración básica de CORS
+- Métricas Prometheus en /metrics (latencias por etapa y tamaño de respuestas)
+- ETags con la versión del catálogo (304 sin tocar la DB) en las lecturas
+- Carga del snapshot en memoria de alimentos y de la réplica local al startup, más un warm-up
+  (pool, clientes, caches) antes de marcar ready y un perfil de tiempos en /health/startup
 - Log de rutas al startup (dev)
 """
 
 import os
+import time
+import asyncio
 import logging
 from typing import List
 
-from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
+# Primero, para medir el resto de los imports (sólo depende de la stdlib y settings)
+from api.startup import profiler, warm_up
+
+with profiler.stage("import:fastapi"):
+    from fastapi import FastAPI, Request, status
+    from fastapi.responses import JSONResponse, Response
+    from fastapi.middleware.cors import CORSMiddleware
 
 # routers
-from api.routes.alimentos import router as alimentos_router
+with profiler.stage("import:alimentos"):
+    from api.routes.alimentos import router as alimentos_router
+    from api.middleware import catalog_etag_middleware
+    from api.metrics import MetricsMiddleware, CONTENT_TYPE_LATEST, render_metrics
 
 # intentar importar el router del asistente de forma segura
 asistente_router = None
 try:
-    from api.routes.asistente_ia import router as asistente_router
+    with profiler.stage("import:asistente_ia"):
+        from api.routes.asistente_ia import router as asistente_router
 except Exception as e:
     logging.getLogger("api").warning("No se pudo importar api.routes.asistente_ia: %s", e)
 
 # intentar importar el router de recetas de forma segura
 receta_router = None
 try:
-    from api.routes.receta_ia import router as receta_router
+    with profiler.stage("import:receta_ia"):
+        from api.routes.receta_ia import router as receta_router
 except Exception as e:
     logging.getLogger("api").warning("No se pudo importar api.routes.receta_ia: %s", e)
 
-# repo para healthcheck
-from api.db.repositories.alimento_repo import get_all as repo_get_all
+# repo para healthcheck y snapshot en memoria
+with profiler.stage("import:db"):
+    from api.db.repositories.alimento_repo import catalog_version_loop, load_snapshot, refresh_catalog_version
+    from api.health import monitor
+    from api.db.resilience import breakers_stats
+    from api.db.result_cache import result_cache
+    from api.db.replica import replica, refresh_replica, replica_refresh_loop
+    from api.config import settings
 
 # configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -62,6 +83,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ETag / 304 para las lecturas del catálogo
+app.middleware("http")(catalog_etag_middleware)
+
+# Métricas HTTP (el último agregado es el más externo: mide también los 304)
+app.add_middleware(MetricsMiddleware)
+
 # Registro de routers
 app.include_router(alimentos_router)
 
@@ -86,21 +113,110 @@ async def runtime_error_handler(request: Request, exc: RuntimeError):
 
 
 @app.get("/", summary="Root", tags=["meta"])
-def root():
+async def root():
     return {"message": "API Nutricional - OK", "docs": "/docs", "openapi": "/openapi.json"}
 
 
+@app.get("/metrics", summary="Métricas Prometheus", tags=["meta"], include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health", summary="Healthcheck", tags=["meta"])
-def health():
-    try:
-        rows = repo_get_all(limit=1, offset=0)
-        return {"status": "ok", "db_rows_returned": len(rows)}
-    except RuntimeError as e:
-        logger.exception("Healthcheck falló al consultar la DB")
-        return JSONResponse(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            content={"status": "error", "detail": "DB unreachable", "error": str(e)},
-        )
+async def health():
+    """
+    Estado completo desde el cache del monitor (no consulta la DB).
+    """
+    estado = monitor.snapshot()
+    body = {
+        "status": "ok" if estado["ready"] else "error",
+        **estado,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "circuit_breakers": breakers_stats(),
+    }
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if estado["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=body,
+    )
+
+
+@app.get("/health/live", summary="Liveness", tags=["meta"])
+async def health_live():
+    return {"status": "alive", "uptime_s": round(time.time() - monitor.started_at, 1)}
+
+
+@app.get("/health/ready", summary="Readiness", tags=["meta"])
+async def health_ready():
+    estado = monitor.snapshot()
+    estado["circuit_breakers"] = breakers_stats()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if estado["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=estado,
+    )
+
+
+@app.get("/health/startup", summary="Perfil del arranque", tags=["meta"], include_in_schema=False)
+async def health_startup():
+    return {"warmed": monitor.warmed, **profiler.report()}
+
+
+# Referencias a las tareas del arranque y de recarga periódica de la réplica y de
+# la versión del catálogo
+_replica_task = None
+_catalogo_task = None
+_arranque_task = None
+
+
+async def cargar_replica():
+    global _replica_task
+    if replica is None:
+        return
+    await refresh_replica()
+    if settings.SQL_REPLICA_REFRESH_SECONDS > 0:
+        _replica_task = asyncio.create_task(replica_refresh_loop())
+
+
+async def _arrancar():
+    """
+    Snapshot, réplica y warm-up; recién al final /health/ready puede pasar a 200.
+    """
+    global _catalogo_task
+    cargado = False
+    if settings.SNAPSHOT_ENABLED:
+        with profiler.stage("startup:snapshot"):
+            cargado = await load_snapshot()
+    if not cargado:
+        # Sin snapshot la versión del catálogo (ETags) sale de la tabla completa
+        with profiler.stage("startup:catalog_version"):
+            await refresh_catalog_version()
+        if settings.CATALOG_CACHE_MAX_AGE > 0:
+            _catalogo_task = asyncio.create_task(catalog_version_loop())
+    with profiler.stage("startup:replica"):
+        await cargar_replica()
+    await warm_up()
+    # Primera ronda del monitor antes de aceptar tráfico, después en segundo plano
+    with profiler.stage("startup:health"):
+        await monitor.run_checks()
+    monitor.start()
+    monitor.mark_warm()
+    profiler.finish()
+
+
+@app.on_event("startup")
+async def arranque():
+    global _arranque_task
+    if settings.STARTUP_BACKGROUND:
+        _arranque_task = asyncio.create_task(_arrancar())
+    else:
+        await _arrancar()
+
+
+@app.on_event("shutdown")
+async def detener_tareas():
+    for task in (_arranque_task, _replica_task, _catalogo_task):
+        if task is not None:
+            task.cancel()
+    await monitor.stop()
 
 
 @app.on_event("startup")
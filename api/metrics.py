@@ -0,0 +1,129 @@
+"""
+Métricas Prometheus de la API (se exponen en /metrics).
+
+- llm_request_seconds: llamadas al upstream del LLM por tipo (sql | receta) y
+  resultado (una por request a Gemini, incluidas las de hedging).
+- llm_coalesced_wait_seconds: espera de los llamadores que se sumaron a una llamada
+  idéntica en vuelo (singleflight), sin nueva llamada al upstream.
+- sql_validation_seconds: validación del SQL generado, por resultado.
+- ask_fastpath_total: preguntas de /ask resueltas por reglas (hit) o enviadas al
+  LLM (miss); tasa = hit / (hit + miss).
+- ask_batch_items_total: preguntas traducidas dentro de un lote (ok) o devueltas al
+  camino individual (fallback).
+- db_query_seconds / db_query_retries_total: execute_sql contra Postgres.
+- dependency_up: resultado del último health check por dependencia (api.health).
+- circuit_breaker_open: estado de los circuit breakers (api.db.resilience).
+- supabase_call_seconds: llamadas a PostgREST por función del repositorio.
+- http_request_seconds / http_response_size_bytes: por ruta, método y status
+  (middleware MetricsMiddleware).
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Buckets pensados para llamadas remotas (de milisegundos a decenas de segundos)
+_REMOTE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Trabajo local en CPU (validación de SQL)
+_LOCAL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+_SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LLM_LATENCY = Histogram(
+    "llm_request_seconds", "Latencia de las llamadas al LLM", ["kind", "outcome"], buckets=_REMOTE_BUCKETS
+)
+LLM_COALESCED_WAIT = Histogram(
+    "llm_coalesced_wait_seconds",
+    "Espera de los llamadores que comparten una llamada al LLM en vuelo",
+    ["kind", "outcome"],
+    buckets=_REMOTE_BUCKETS,
+)
+SQL_VALIDATION = Histogram(
+    "sql_validation_seconds", "Tiempo de validación del SQL generado", ["outcome"], buckets=_LOCAL_BUCKETS
+)
+ASK_FASTPATH = Counter(
+    "ask_fastpath_total", "Preguntas de /ask traducidas por reglas (hit) o por el LLM (miss)", ["outcome"]
+)
+ASK_BATCH_ITEMS = Counter(
+    "ask_batch_items_total", "Preguntas de /ask en lotes: traducidas (ok) o al camino individual (fallback)", ["outcome"]
+)
+DB_QUERY = Histogram(
+    "db_query_seconds", "Latencia de las consultas SQL directas", ["outcome"], buckets=_REMOTE_BUCKETS
+)
+DB_RETRIES = Counter("db_query_retries_total", "Reintentos de consultas SQL directas")
+DEPENDENCY_UP = Gauge("dependency_up", "1 si el último health check de la dependencia pasó", ["name"])
+BREAKER_OPEN = Gauge("circuit_breaker_open", "1 si el circuit breaker está abierto", ["name"])
+SUPABASE_LATENCY = Histogram(
+    "supabase_call_seconds", "Latencia de las llamadas a Supabase", ["function", "outcome"], buckets=_REMOTE_BUCKETS
+)
+HTTP_LATENCY = Histogram(
+    "http_request_seconds", "Latencia de las respuestas HTTP", ["route", "method", "status"], buckets=_REMOTE_BUCKETS
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Tamaño del cuerpo de las respuestas HTTP", ["route", "method", "status"], buckets=_SIZE_BUCKETS
+)
+
+
+@contextmanager
+def observe(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """
+    Mide el bloque y lo registra con outcome "ok", "timeout", "cancelled" o "error"
+    según termine.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: cuenta los bytes que realmente se envían (sirve también para
+    StreamingResponse) y etiqueta con la plantilla de la ruta, no con el path real.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": 500, "size": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            labels = {
+                "route": getattr(route, "path", "unmatched"),
+                "method": scope.get("method", ""),
+                "status": str(state["status"]),
+            }
+            HTTP_LATENCY.labels(**labels).observe(time.perf_counter() - start)
+            HTTP_RESPONSE_SIZE.labels(**labels).observe(state["size"])
+
+
+def render_metrics() -> bytes:
+    return generate_latest()
+
@@ -0,0 +1,3 @@
+from .catalog_etag import catalog_etag_middleware
+
+__all__ = ["catalog_etag_middleware"]
@@ -0,0 +1,59 @@
+"""
+ETags y respuestas 304 para las lecturas del catálogo.
+
+El ETag es fuerte y sale de la versión del catálogo (api.db.catalog) más la ruta y
+la query, así que se calcula sin tocar la DB: si el cliente manda un If-None-Match
+que coincide se responde 304 antes de llegar al endpoint. Las respuestas 200
+llevan además Cache-Control para que un CDN absorba las lecturas repetidas.
+
+If-None-Match: * sólo vale si el recurso existe: se ejecuta el endpoint y se responde 304 si dio 2xx
+(un /alimento/99999999 sigue siendo 404).
+"""
+
+import hashlib
+import re
+from typing import Set
+
+from fastapi import Request, Response
+
+from api.config import settings
+from api.db.catalog import catalog_version
+
+# Lecturas GET que dependen sólo del catálogo
+CATALOG_READ_PATHS = re.compile(r"^/(alimentos(/export)?|alimento/[^/]+(/similares)?|buscar_alimento)$")
+
+
+def catalog_etag(path: str, query: str) -> str:
+    params = "&".join(sorted(query.split("&"))) if query else ""
+    raw = f"{catalog_version()}|{path}|{params}"
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _tags(if_none_match: str) -> Set[str]:
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    return {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+async def catalog_etag_middleware(request: Request, call_next):
+    if request.method not in ("GET", "HEAD") or not CATALOG_READ_PATHS.match(request.url.path):
+        return await call_next(request)
+
+    etag = catalog_etag(request.url.path, request.url.query)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}",
+    }
+    comodin = False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = _tags(if_none_match)
+        if etag in tags:
+            return Response(status_code=304, headers=headers)
+        comodin = "*" in tags
+
+    response = await call_next(request)
+    if comodin and 200 <= response.status_code < 300:
+        return Response(status_code=304, headers=headers)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
@@ -1,75 +1,202 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
-from api.schemas.alimento_schema import AlimentoCreate, AlimentoRead, AlimentoFilter
+import math
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
+from api.schemas.alimento_schema import AlimentoCreate, AlimentoRead, AlimentoFilter, AlimentoPage
 from api.services.alimento_service import (
     list_alimentos,
     create_alimento,
     find_alimento,
     search_alimentos_db,
-    search_alimentos_nombre
+    search_alimentos_nombre,
+    list_alimentos_pagina,
+    search_alimentos_db_pagina,
+    search_alimentos_nombre_pagina,
+    find_similares,
+    exportar_alimentos,
+    importar_alimentos,
+    EXPORT_FORMATS,
 )
+from api.db.snapshot import NUMERIC_COLUMNS
+from api.routes.fast_json import fast_json_enabled, alimento_response, lista_response, pagina_response
 
 router = APIRouter(tags=["alimentos"])
 
-@router.get("/alimentos", response_model=List[AlimentoRead])
-def read_alimentos(limit: int = 100, offset: int = 0):
+CURSOR_DESCRIPTION = (
+    "Paginación por cursor: vacío para la primera página, luego el next_cursor de la "
+    "respuesta anterior. Si se envía, la respuesta es {items, next_cursor} y se ignora offset."
+)
+
+# Con FAST_JSON_ENABLED se devuelve un Response ya serializado (FastAPI no aplica el response_model)
+def _lista(items):
+    return lista_response(items) if fast_json_enabled() else items
+
+def _pagina(pagina):
+    return pagina_response(pagina) if fast_json_enabled() else pagina
+
+@router.get("/alimentos", response_model=Union[List[AlimentoRead], AlimentoPage])
+async def read_alimentos(
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+):
     """
     Endpoint para listar alimentos.
     """
+    if cursor is not None:
+        try:
+            return _pagina(await list_alimentos_pagina(limit=limit, cursor=cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=f"Error al obtener alimentos: {str(e)}")
     try:
-        items = list_alimentos(limit=limit, offset=offset)
+        items = await list_alimentos(limit=limit, offset=offset)
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=f"Error al obtener alimentos: {str(e)}")
     if not items:
         raise HTTPException(status_code=404, detail="No se encontraron alimentos")
-    return items
+    return _lista(items)
+
+
+@router.get("/alimentos/export")
+async def export_alimentos(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Exporta el catálogo completo en streaming (NDJSON o CSV), sin paginar.
+    """
+    stream = exportar_alimentos(format)
+    try:
+        # Arrancamos el generador acá para poder devolver 503 antes de empezar a responder
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=f"Error al exportar alimentos: {str(e)}")
+
+    async def body():
+        yield first
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="alimentos.{format}"'},
+    )
+
+
+@router.post("/alimentos/bulk")
+async def bulk_alimentos(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="Por defecto según el Content-Type"),
+):
+    """
+    Carga masiva de alimentos desde un CSV o NDJSON enviado en streaming.
+    Devuelve un reporte con las filas insertadas y el error de cada fila rechazada.
+    """
+    formato = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    try:
+        return await importar_alimentos(request.stream(), formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=f"Error en la carga masiva: {str(e)}")
 
 
 @router.get("/alimento/{codigo}", response_model=AlimentoRead)
-def read_alimento(codigo: int):
-    item = find_alimento(codigo)
+async def read_alimento(codigo: int):
+    item = await find_alimento(codigo)
 
     if not item:
         raise HTTPException(status_code=404, detail=f"Alimento con código {codigo} no encontrado")
 
-    return item
+    return alimento_response(item) if fast_json_enabled() else item
+
+
+@router.get("/alimento/{codigo}/similares")
+async def read_alimentos_similares(
+    codigo: int,
+    k: int = Query(10, ge=1, le=100),
+    pesos: Optional[str] = Query(None, description="Pesos por nutriente, ej: protein:2,energ_kcal:0.5"),
+):
+    """
+    Alimentos con perfil nutricional parecido (para sustituciones).
+    """
+    pesos_dict = {}
+    if pesos:
+        try:
+            for par in pesos.split(","):
+                col, valor = par.split(":")
+                col = col.strip()
+                peso = float(valor)
+                # nan/inf harían no finitas todas las distancias (y la respuesta, [])
+                if col not in NUMERIC_COLUMNS or not math.isfinite(peso) or peso < 0:
+                    raise ValueError(col)
+                pesos_dict[col] = peso
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Pesos inválidos: {pesos}")
+    try:
+        items = find_similares(codigo, k=k, pesos=pesos_dict)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if items is None:
+        raise HTTPException(status_code=404, detail=f"Alimento con código {codigo} no encontrado")
+    return items
 
 
 @router.get("/buscar_alimento")
-def buscar_alimentos_por_nombre(
+async def buscar_alimentos_por_nombre(
     nombre: str = Query(..., description="Texto parcial del nombre del alimento"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
 ):
     try:
-        return search_alimentos_nombre(nombre, limit=limit, offset=offset)
+        if cursor is not None:
+            return _pagina(await search_alimentos_nombre_pagina(nombre, limit=limit, cursor=cursor))
+        return _lista(await search_alimentos_nombre(nombre, limit=limit, offset=offset))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en búsqueda: {str(e)}")
 
 
 
-@router.post("/buscar", response_model=List[AlimentoRead])
-def buscar_alimentos(filters: AlimentoFilter, limit: int = 100, offset: int = 0):
+@router.post("/buscar", response_model=Union[List[AlimentoRead], AlimentoPage])
+async def buscar_alimentos(
+    filters: AlimentoFilter,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+):
     """
     Endpoint para buscar alimentos aplicando filtros.
     """
     fdict = {k: v for k, v in filters.dict().items() if v is not None}
+    if cursor is not None:
+        try:
+            return _pagina(await search_alimentos_db_pagina(fdict, limit=limit, cursor=cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=f"Error al buscar alimentos: {str(e)}")
     try:
-        results = search_alimentos_db(fdict, limit=limit, offset=offset)
+        results = await search_alimentos_db(fdict, limit=limit, offset=offset)
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=f"Error al buscar alimentos: {str(e)}")
     if not results:
         raise HTTPException(status_code=404, detail="No se encontraron alimentos con los filtros aplicados")
-    return results
+    return _lista(results)
 
 
 @router.post("/alimento", response_model=AlimentoRead, status_code=201)
-def create_alimento_endpoint(item: AlimentoCreate):
+async def create_alimento_endpoint(item: AlimentoCreate):
     """
     Endpoint para crear alimento.
     """
     try:
-        created = create_alimento(item)
+        created = await create_alimento(item)
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=f"Error al crear alimento: {str(e)}")
 
@@ -13,7 +13,7 @@ class AskRequest(BaseModel):
     max_results: Optional[int] = Field(10, ge=1, le=500)
 
 @router.post("/ask", response_model=List[Dict[str, Any]])
-def ask_endpoint(payload: AskRequest):
+async def ask_endpoint(payload: AskRequest):
     start_time = time.time()
     question = payload.question.strip()
     max_results = payload.max_results
@@ -21,7 +21,7 @@ def ask_endpoint(payload: AskRequest):
     logger.info(f"Processing ask request: question='{question[:100]}...', max_results={max_results}")
 
     try:
-        results = ask_llm_and_execute(question, max_results=max_results)
+        results = await ask_llm_and_execute(question, max_results=max_results)
         
         elapsed = time.time() - start_time
         logger.info(f"Ask request completed successfully in {elapsed:.2f}s, returned {len(results)} results")
@@ -0,0 +1,61 @@
+"""
+Camino rápido (opcional, FAST_JSON_ENABLED) para serializar listas de alimentos.
+
+Las filas vienen del snapshot o de la DB y ya tienen la forma de AlimentoRead, así
+que no se revalidan: se proyectan a las columnas del modelo y se serializan con
+orjson. Las filas del snapshot se serializan una sola vez y sus bytes se pegan
+directamente en el array de la respuesta.
+"""
+
+from typing import Any, Dict, List
+
+from fastapi.responses import Response
+
+from api.config import settings
+from api.db.snapshot import COLUMNS, NUMERIC_COLUMNS, snapshot
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+_NUMERIC = frozenset(NUMERIC_COLUMNS)
+
+
+def fast_json_enabled() -> bool:
+    return settings.FAST_JSON_ENABLED and orjson is not None
+
+
+def _serializar(row: dict) -> bytes:
+    # Misma salida que AlimentoRead: sólo columnas del modelo y numéricos como float
+    out: Dict[str, Any] = {}
+    for c in COLUMNS:
+        v = row.get(c)
+        if v is not None and c in _NUMERIC:
+            v = float(v)
+        out[c] = v
+    return orjson.dumps(out)
+
+
+def alimento_bytes(row: dict) -> bytes:
+    return snapshot.blob(row, _serializar) or _serializar(row)
+
+
+def _lista_bytes(rows: List[dict]) -> bytes:
+    return b"[" + b",".join(alimento_bytes(r) for r in rows) + b"]"
+
+
+def alimento_response(row: dict) -> Response:
+    return Response(content=alimento_bytes(row), media_type="application/json")
+
+
+def lista_response(rows: List[dict]) -> Response:
+    return Response(content=_lista_bytes(rows), media_type="application/json")
+
+
+def pagina_response(pagina: Dict[str, Any]) -> Response:
+    content = (
+        b'{"items":' + _lista_bytes(pagina["items"])
+        + b',"next_cursor":' + orjson.dumps(pagina["next_cursor"]) + b"}"
+    )
+    return Response(content=content, media_type="application/json")
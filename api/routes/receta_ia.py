@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List, Dict
-from pydantic import BaseModel
-from api.services.receta_service import crear_receta, RecetaError
+from pydantic import BaseModel, Field
+import json
+from api.services.receta_service import crear_receta, crear_recetas_batch, preparar_receta, stream_receta, RecetaError
 
 router = APIRouter(tags=["asistente"])
 
@@ -12,12 +14,54 @@ class Ingrediente(BaseModel):
 class RecetaRequest(BaseModel):
     ingredientes: List[Ingrediente]
 
+class RecetaBatchRequest(BaseModel):
+    recetas: List[RecetaRequest] = Field(..., min_length=1, max_length=100)
+
 @router.post("/receta", response_model=Dict)
-def receta_endpoint(payload: RecetaRequest):
+async def receta_endpoint(payload: RecetaRequest):
     try:
-        receta = crear_receta([i.dict() for i in payload.ingredientes])
+        receta = await crear_receta([i.dict() for i in payload.ingredientes])
     except RecetaError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception:
         raise HTTPException(status_code=500, detail="Error interno")
     return receta
+
+
+@router.post("/receta/stream")
+async def receta_stream_endpoint(payload: RecetaRequest):
+    """
+    Igual que /receta pero por Server-Sent Events: el primer evento ("nutricion") trae
+    los ingredientes y la nutrición total apenas se consultan los alimentos; después
+    llegan "titulo", los fragmentos de "instrucciones" y "fin" con la receta completa
+    (o "error" si el LLM falla).
+    """
+    try:
+        ingredientes, nutricion = await preparar_receta([i.dict() for i in payload.ingredientes])
+    except RecetaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def eventos():
+        async for evento, datos in stream_receta(ingredientes, nutricion):
+            yield f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        # Sin buffering en proxies (nginx) para que cada evento salga al instante
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/recetas/batch", response_model=Dict)
+async def recetas_batch_endpoint(payload: RecetaBatchRequest):
+    """
+    Genera varias recetas en un solo request. Devuelve resultados parciales:
+    cada ítem de "resultados" trae "receta" o "error" según cómo le fue.
+    """
+    try:
+        return await crear_recetas_batch([[i.dict() for i in r.ingredientes] for r in payload.recetas])
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Error interno")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 # --- Base para todos los alimentos ---
 class AlimentoBase(BaseModel):
@@ -37,6 +37,10 @@ class AlimentoBase(BaseModel):
 class AlimentoCreate(AlimentoBase):
     pass
 
+# --- Para carga masiva (el código es opcional, si falta lo asigna la DB) ---
+class AlimentoBulkRow(AlimentoCreate):
+    codigomex2: Optional[int] = None
+
 # --- Para lectura ---
 class AlimentoRead(AlimentoBase):
     codigomex2: int
@@ -44,6 +48,11 @@ class AlimentoRead(AlimentoBase):
     class Config:
         orm_mode = True
 
+# --- Página con cursor (paginación por keyset) ---
+class AlimentoPage(BaseModel):
+    items: List[AlimentoRead]
+    next_cursor: Optional[str] = None
+
 # --- Para filtrar alimentos ---
 class AlimentoFilter(BaseModel):
     max_calorias: Optional[float] = None
@@ -1,27 +1,234 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from api.db.repositories.alimento_repo import (
+    can_stream_all,
+    stream_all,
     get_all,
     get_by_codigo,
     insert_alimento,
     search_alimentos,
     search_by_nombre,
+    search_by_nombre_keyset,
+    insert_alimentos_bulk,
 )
-from api.schemas.alimento_schema import AlimentoCreate
+from api.db.catalog import notify_catalog_changed
+from api.config import settings
+from pydantic import ValidationError
+from api.db.cursor import encode_cursor, decode_cursor
+from api.schemas.alimento_schema import AlimentoCreate, AlimentoBulkRow
+from api.db.similarity import get_index
+from api.db.snapshot import snapshot, COLUMNS
+import codecs
+import csv
+import io
+import json
 
-def list_alimentos(limit: int = 100, offset: int = 0):
-    return get_all(limit=limit, offset=offset)
+async def list_alimentos(limit: int = 100, offset: int = 0):
+    return await get_all(limit=limit, offset=offset)
 
-def create_alimento(payload: AlimentoCreate):
-    created = insert_alimento(payload.dict())
+async def create_alimento(payload: AlimentoCreate):
+    created = await insert_alimento(payload.dict())
     if not created:
         raise RuntimeError("No se pudo crear el alimento")
     return created
 
-def find_alimento(codigo: int):
-    return get_by_codigo(codigo)
+async def find_alimento(codigo: int):
+    return await get_by_codigo(codigo)
 
-def search_alimentos_db(filters: Dict[str, Any], limit: int = 100, offset: int = 0):
-    return search_alimentos(filters=filters, limit=limit, offset=offset)
+async def search_alimentos_db(filters: Dict[str, Any], limit: int = 100, offset: int = 0):
+    return await search_alimentos(filters=filters, limit=limit, offset=offset)
 
-def search_alimentos_nombre(nombre: str, limit: int = 50, offset: int = 0):
-    return search_by_nombre(nombre=nombre, limit=limit, offset=offset)
+async def search_alimentos_nombre(nombre: str, limit: int = 50, offset: int = 0):
+    return await search_by_nombre(nombre=nombre, limit=limit, offset=offset)
+
+def _pagina(items: List[dict], limit: int, clave: Optional[List[int]]) -> Dict[str, Any]:
+    # Página incompleta = no hay más resultados
+    next_cursor = encode_cursor(clave) if clave is not None and len(items) >= limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+def _ultimo_codigo(items: List[dict]) -> Optional[List[int]]:
+    return [int(items[-1]["codigomex2"])] if items else None
+
+async def list_alimentos_pagina(limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Paginación por keyset sobre codigomex2. Lanza ValueError si el cursor es inválido.
+    """
+    after = decode_cursor(cursor)
+    items = await get_all(limit=limit, after=None if after is None else after[0])
+    return _pagina(items, limit, _ultimo_codigo(items))
+
+async def search_alimentos_db_pagina(filters: Dict[str, Any], limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+    after = decode_cursor(cursor)
+    items = await search_alimentos(filters=filters, limit=limit, after=None if after is None else after[0])
+    return _pagina(items, limit, _ultimo_codigo(items))
+
+async def search_alimentos_nombre_pagina(nombre: str, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+    # El cursor es la clave de relevancia (4 enteros) o, sin snapshot, el código (1 entero)
+    after = decode_cursor(cursor, largos=(1, 4))
+    items, clave = await search_by_nombre_keyset(nombre, limit=limit, after=after)
+    return _pagina(items, limit, clave)
+
+def find_similares(codigo: int, k: int = 10, pesos: Optional[Dict[str, float]] = None) -> Optional[List[dict]]:
+    """
+    Alimentos nutricionalmente parecidos a `codigo`, con su distancia.
+    Devuelve None si el código no existe; lanza RuntimeError si el índice no está disponible.
+    """
+    index = get_index()
+    if index is None:
+        raise RuntimeError("Índice de similitud no disponible (snapshot no cargado)")
+    vecinos = index.nearest(codigo, k=k, pesos=pesos)
+    if vecinos is None:
+        return None
+    out = []
+    for cod, distancia in vecinos:
+        row = snapshot.get(cod)
+        if row is not None:
+            out.append({**row, "distancia": round(distancia, 4)})
+    return out
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+async def exportar_alimentos(formato: str = "ndjson") -> AsyncIterator[bytes]:
+    """
+    Genera el catálogo completo como NDJSON o CSV, lote por lote.
+    """
+    if not can_stream_all():
+        raise RuntimeError("Exportación no disponible: falta DATABASE_URL o el snapshot")
+    if formato == "csv":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        yield buf.getvalue().encode("utf-8")
+        async for batch in stream_all():
+            buf.seek(0)
+            buf.truncate()
+            writer.writerows(batch)
+            yield buf.getvalue().encode("utf-8")
+    else:
+        async for batch in stream_all():
+            yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch).encode("utf-8")
+
+async def _lineas(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Decodifica el cuerpo a medida que llega y lo entrega línea por línea (tolera BOM).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pendiente = ""
+    try:
+        async for chunk in stream:
+            pendiente += decoder.decode(chunk)
+            *lineas, pendiente = pendiente.split("\n")
+            for linea in lineas:
+                yield linea
+        pendiente += decoder.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise ValueError("El archivo no está en UTF-8") from e
+    if pendiente:
+        yield pendiente
+
+async def _registros(stream: AsyncIterator[bytes], formato: str) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Genera (numero_de_fila, registro, error) a partir de un cuerpo CSV o NDJSON.
+    En CSV la primera línea es el encabezado y no cuenta como fila.
+    """
+    fila = 0
+    if formato != "csv":
+        async for linea in _lineas(stream):
+            if not linea.strip():
+                continue
+            fila += 1
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                yield fila, None, "JSON inválido"
+                continue
+            if not isinstance(registro, dict):
+                yield fila, None, "se esperaba un objeto JSON"
+                continue
+            yield fila, registro, None
+        return
+
+    encabezado: Optional[List[str]] = None
+    pendiente: List[str] = []
+    async for linea in _lineas(stream):
+        pendiente.append(linea)
+        texto = "\n".join(pendiente)
+        # Un campo entre comillas puede contener saltos de línea: esperar a cerrarlo
+        if texto.count('"') % 2:
+            continue
+        pendiente = []
+        if not texto.strip():
+            continue
+        valores = next(csv.reader([texto]))
+        if encabezado is None:
+            encabezado = [v.strip() for v in valores]
+            continue
+        fila += 1
+        if len(valores) != len(encabezado):
+            yield fila, None, f"se esperaban {len(encabezado)} columnas y hay {len(valores)}"
+            continue
+        yield fila, {k: (v if v != "" else None) for k, v in zip(encabezado, valores)}, None
+    if pendiente:
+        yield fila + 1, None, "comillas sin cerrar"
+
+def _mensaje_validacion(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+async def importar_alimentos(stream: AsyncIterator[bytes], formato: str = "ndjson") -> Dict[str, Any]:
+    """
+    Carga masiva desde un cuerpo CSV o NDJSON en streaming:
+    1. Valida cada fila contra AlimentoBulkRow
+    2. Escribe de a BULK_CHUNK_SIZE filas (COPY con DATABASE_URL, insert por lote si no)
+    3. Notifica un único cambio del catálogo al terminar
+    Devuelve el reporte con las filas que fallaron (validación o DB).
+    """
+    total = insertadas = cantidad_errores = 0
+    errores: List[Dict[str, Any]] = []
+    lote: List[dict] = []
+    filas_lote: List[int] = []
+
+    def registrar_error(fila: int, error: str) -> None:
+        nonlocal cantidad_errores
+        cantidad_errores += 1
+        if len(errores) < settings.BULK_MAX_ERRORES:
+            errores.append({"fila": fila, "error": error})
+
+    async def volcar() -> None:
+        nonlocal insertadas
+        if not lote:
+            return
+        fallidas = await insert_alimentos_bulk(lote)
+        for i, error in fallidas:
+            registrar_error(filas_lote[i], error)
+        insertadas += len(lote) - len(fallidas)
+        lote.clear()
+        filas_lote.clear()
+
+    try:
+        async for fila, registro, error in _registros(stream, formato):
+            total += 1
+            if error is not None:
+                registrar_error(fila, error)
+                continue
+            try:
+                row = AlimentoBulkRow(**registro).dict()
+            except ValidationError as e:
+                registrar_error(fila, _mensaje_validacion(e))
+                continue
+            if row["codigomex2"] is None:
+                del row["codigomex2"]
+            lote.append(row)
+            filas_lote.append(fila)
+            if len(lote) >= settings.BULK_CHUNK_SIZE:
+                await volcar()
+        await volcar()
+    finally:
+        # Lo que ya se escribió queda escrito aunque la carga se corte a mitad
+        if insertadas:
+            notify_catalog_changed(None)
+
+    return {
+        "total": total,
+        "insertadas": insertadas,
+        "errores": cantidad_errores,
+        "detalle_errores": sorted(errores, key=lambda e: e["fila"]),
+    }
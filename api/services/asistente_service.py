@@ -1,10 +1,24 @@
 import re
 import logging
+import hashlib
 from typing import Optional, Dict, Any, List
 import asyncio
-import functools
-from api.db.sql import execute_sql
+import time
+from api.db.sql import execute_sql, explain_cost
+from api.db.replica import replica
+from api.db.text_index import fold
+from api.cache import PersistentCache
+from api.services.llm_gateway import gateway, LLMUnavailableError
+from api.services.nl_rules import parse_question
+from api.services.ask_batcher import AskBatcher
+from api.services.sql_validator import (
+    ALLOWED_COLUMNS,
+    FORBIDDEN_KEYWORDS,
+    UnsafeSQLError,
+    validate_select,
+)
 from api.config import settings
+from api.metrics import ASK_FASTPATH, SQL_VALIDATION
 
 logger = logging.getLogger("asistente")
 
@@ -21,21 +35,27 @@ class ExecutionError(Exception):
 class TimeoutError(Exception):
     pass
 
-# Lista blanca de columnas (tu modelo SQLAlchemy)
-ALLOWED_COLUMNS = {
-    "codigomex2", "nombre_del_alimento", "energ_kcal", "carbohydrt", "lipid_tot",
-    "protein", "fiber_td", "calcium", "iron", "ironhem", "ironnohem", "zinc",
-    "vit_c", "thiamin", "riboflavin", "niacin", "panto_acid", "vit_b6",
-    "folic_acid", "food_folate", "folate_dfe", "vit_b12", "vit_a_rae",
-    "vit_e", "vit_d_iu", "vit_k", "fa_sat", "fa_mono", "fa_poly", "chole"
-}
-
-FORBIDDEN_KEYWORDS = {
-    "drop", "delete", "update", "insert", "alter", "truncate", "grant", "revoke",
-    "create", "replace", "merge", "call", "execute"
-}
+# Cache pregunta -> SQL ya validada (persistente entre reinicios y workers)
+sql_cache: Optional[PersistentCache] = None
+if settings.LLM_CACHE_ENABLED:
+    sql_cache = PersistentCache(
+        "question_sql",
+        path=settings.LLM_CACHE_PATH,
+        max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        ttl=settings.LLM_CACHE_TTL,
+    )
+
+def _normalize_question(question: str) -> str:
+    """
+    Normaliza la pregunta para usarla como clave: sin acentos, minúsculas,
+    sin signos de puntuación y con espacios colapsados.
+    """
+    txt = re.sub(r"[¿?¡!.,;:\"']", " ", fold(question))
+    return " ".join(txt.split())
 
-SELECT_FROM_REGEX = re.compile(r"(?is)^\s*select\b.*\bfrom\s+alimentos\b.*$")
+def _cache_key(question: str, max_results: Optional[int]) -> str:
+    raw = f"{max_results}|{_normalize_question(question)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 def _extract_sql_from_text(text: str) -> Optional[str]:
     """
@@ -60,40 +80,38 @@ def _extract_sql_from_text(text: str) -> Optional[str]:
     
     return first_chunk.strip()
 
-def _contains_forbidden_keyword(sql: str) -> bool:
-    lower = sql.lower()
-    for kw in FORBIDDEN_KEYWORDS:
-        if re.search(rf"\b{re.escape(kw)}\b", lower):
-            return True
-    return False
-
-def _validate_sql(sql: str) -> Optional[str]:
-    if not sql:
-        return None
-    sql_str = sql.strip()
-    if sql_str.endswith(";"):
-        sql_str = sql_str[:-1].strip()
-    if ";" in sql_str:
-        return None
-    if not SELECT_FROM_REGEX.match(sql_str):
-        return None
-    if _contains_forbidden_keyword(sql_str):
+def _validate_sql(sql: str, max_results: Optional[int] = None) -> Optional[str]:
+    """
+    Valida con el parser (sql_validator) y devuelve la SQL con el LIMIT inyectado o
+    recortado a max_results (o SQL_MAX_LIMIT). Devuelve None si no es segura o si su
+    costo estimado supera SQL_COST_BUDGET.
+    """
+    start = time.perf_counter()
+    try:
+        validated, cost = validate_select(
+            sql,
+            max_limit=max_results or settings.SQL_MAX_LIMIT,
+            cost_budget=settings.SQL_COST_BUDGET,
+        )
+    except UnsafeSQLError as e:
+        SQL_VALIDATION.labels(outcome="rejected").observe(time.perf_counter() - start)
+        logger.info("SQL rechazada: %s", e)
         return None
+    SQL_VALIDATION.labels(outcome="ok").observe(time.perf_counter() - start)
+    logger.debug("SQL validada (costo estimado %g): %s", cost, validated)
+    return validated
 
-    # Si el query usa "*", permitimos; si declara columnas, comprobamos que al menos las usadas están en allowed.
-    if "*" not in sql_str:
-        cols_found = set()
-        # detecta nombres de columnas
-        for col in ALLOWED_COLUMNS:
-            if re.search(rf"\b{re.escape(col)}\b", sql_str, flags=re.IGNORECASE):
-                cols_found.add(col)
-        has_agg = bool(re.search(r"\b(count|avg|min|max|sum)\s*\(", sql_str, flags=re.IGNORECASE))
-        if not cols_found and not has_agg:
-            return None
-
-    return sql_str
-
-def translate_question_to_sql_with_llm(question: str, model: str = "gemini-2.5-flash", max_results: Optional[int] = 10, timeout: int = 30) -> str:
+# Lote de traducciones compartido (opcional); None -> cada pregunta va sola al LLM
+ask_batcher: Optional[AskBatcher] = None
+if settings.ASK_BATCH_ENABLED:
+    ask_batcher = AskBatcher(
+        _extract_sql_from_text,
+        _validate_sql,
+        window=settings.ASK_BATCH_WINDOW_MS / 1000,
+        max_batch=settings.ASK_BATCH_MAX,
+    )
+
+async def translate_question_to_sql_with_llm(question: str, model: str = "gemini-2.5-flash", max_results: Optional[int] = 10, timeout: int = 30) -> str:
     """
     Traduce pregunta a SQL con timeout, validando la salida y asegurando que no queden comillas/backticks.
     """
@@ -104,13 +122,35 @@ def translate_question_to_sql_with_llm(question: str, model: str = "gemini-2.5-f
     if max_results is not None:
         max_results = max(1, min(500, max_results))
 
-    try:
-        from google import genai
-    except Exception as e:
-        logger.exception("genai import failed")
-        raise LLMError("La librería genai no está disponible.") from e
-
-    client = genai.Client(api_key=settings.GENAI_API_KEY)
+    # Camino rápido: las plantillas frecuentes se traducen por reglas, sin LLM
+    if settings.ASK_FASTPATH_ENABLED:
+        rule_sql = parse_question(question, max_results)
+        validated = _validate_sql(rule_sql, max_results) if rule_sql else None
+        if validated:
+            ASK_FASTPATH.labels(outcome="hit").inc()
+            logger.info("SQL obtenida por reglas: %s", repr(validated))
+            return validated
+        ASK_FASTPATH.labels(outcome="miss").inc()
+
+    cache_key = _cache_key(question, max_results)
+    if sql_cache is not None:
+        cached = await sql_cache.aget(cache_key)
+        # Se revalida por si cambiaron las reglas desde que se guardó
+        if cached and _validate_sql(cached, max_results):
+            logger.info("SQL obtenida del cache: %s", repr(cached))
+            return cached
+        if cached:
+            await sql_cache.adelete(cache_key)
+
+    # Con micro-batching la pregunta viaja en un lote; si su respuesta no sirve sigue
+    # por el camino individual de abajo
+    if ask_batcher is not None:
+        batched = await ask_batcher.translate(question, max_results)
+        if batched:
+            logger.info("SQL obtenida en lote: %s", repr(batched))
+            if sql_cache is not None:
+                await sql_cache.aset(cache_key, batched)
+            return batched
 
     prompt = f"""
     Eres un traductor de lenguaje natural a SQL para una tabla Postgres llamada `alimentos`.
@@ -136,62 +176,53 @@ def translate_question_to_sql_with_llm(question: str, model: str = "gemini-2.5-f
 
 
     try:
-        import threading
-        import queue
-
-        result_queue = queue.Queue()
-        exception_queue = queue.Queue()
-
-        def worker():
-            try:
-                result = client.models.generate_content(model=model, contents=prompt)
-                result_queue.put(result)
-            except Exception as e:
-                exception_queue.put(e)
-
-        thread = threading.Thread(target=worker)
-        thread.daemon = True
-        thread.start()
-        thread.join(timeout=timeout)
-
-        if thread.is_alive():
-            logger.error("LLM call timed out")
-            raise TimeoutError(f"El LLM tardó más de {timeout} segundos en responder")
-
-        if not exception_queue.empty():
-            raise exception_queue.get()
-
-        if result_queue.empty():
-            raise LLMError("No se recibió respuesta del LLM")
-
-        response = result_queue.get()
-
-    except TimeoutError:
-        raise
+        text = await gateway.generate(prompt, model=model, timeout=timeout, kind="sql")
+    except asyncio.TimeoutError:
+        logger.error("LLM call timed out")
+        raise TimeoutError(f"El LLM tardó más de {timeout} segundos en responder")
+    except LLMUnavailableError as e:
+        raise LLMError(str(e)) from e
     except Exception as e:
         logger.exception("Error llamando al LLM")
         raise LLMError(f"Error llamando al LLM: {str(e)}") from e
 
-    text = getattr(response, "text", None) or str(response)
     logger.debug("LLM raw response: %s", text)
 
     candidate = _extract_sql_from_text(text)
     if not candidate:
         raise LLMError("El LLM no devolvió una sentencia SELECT válida.")
 
-    validated = _validate_sql(candidate)
+    validated = _validate_sql(candidate, max_results)
     if not validated:
         logger.debug("Candidate SQL failed validation: %s", candidate)
         raise SQLValidationError("La sentencia SQL generada no pasó las validaciones de seguridad.")
 
-    if max_results:
-        if not re.search(r"\blimit\b\s+\d+", validated, flags=re.IGNORECASE):
-            validated = validated.rstrip() + f" LIMIT {int(max_results)}"
-
     logger.info("SQL final validado a ejecutar: %s", repr(validated))
+    if sql_cache is not None:
+        await sql_cache.aset(cache_key, validated)
     return validated
 
-def ask_llm_and_execute(question: str, max_results: Optional[int] = 10) -> List[Dict[str, Any]]:
+async def _run_validated_sql(sql: str) -> List[Dict[str, Any]]:
+    """
+    Ejecuta el SQL ya validado en la réplica local si está disponible; si falla
+    (p.ej. una construcción propia de Postgres) cae a la DB remota.
+    """
+    if replica is not None and replica.is_loaded():
+        try:
+            return await replica.execute(sql)
+        except Exception as e:
+            logger.warning("Réplica local no pudo ejecutar la consulta (%s); se usa Postgres", e)
+
+    # Guardia opcional con el planner de Postgres antes de tocar la DB compartida
+    if settings.SQL_EXPLAIN_MAX_COST is not None:
+        plan_cost = await explain_cost(sql)
+        if plan_cost > settings.SQL_EXPLAIN_MAX_COST:
+            raise SQLValidationError(
+                f"La consulta es demasiado costosa (costo estimado {plan_cost:.0f} > {settings.SQL_EXPLAIN_MAX_COST:.0f})."
+            )
+    return await execute_sql(sql)
+
+async def ask_llm_and_execute(question: str, max_results: Optional[int] = 10) -> List[Dict[str, Any]]:
     """
     Pide SQL al LLM, valida, ejecuta y devuelve resultados.
     Con mejor manejo de errores y timeouts.
@@ -199,11 +230,11 @@ def ask_llm_and_execute(question: str, max_results: Optional[int] = 10) -> List[
     try:
         # Paso 1: Generar SQL con timeout
         logger.info("Generating SQL for question: %.100s", question)
-        sql = translate_question_to_sql_with_llm(question, max_results=max_results, timeout=30)
+        sql = await translate_question_to_sql_with_llm(question, max_results=max_results, timeout=30)
         
-        # Paso 2: Ejecutar SQL inmediatamente (con conexión fresca)
+        # Paso 2: Ejecutar SQL (réplica local o pool async)
         logger.info("Executing SQL: %.200s", sql)
-        rows = execute_sql(sql)
+        rows = await _run_validated_sql(sql)
         
         logger.info("Query executed successfully, returned %d rows", len(rows))
         return rows
@@ -0,0 +1,203 @@
+"""
+Gateway compartido para las llamadas a Gemini (asistente y recetas).
+
+- Un único cliente genai reutilizado por todo el proceso.
+- Tope global de llamadas concurrentes al upstream (semáforo).
+- Singleflight: prompts idénticos en vuelo comparten una sola llamada.
+- Timeout con cancelación real de la corutina.
+- Hedging opcional: si una llamada supera el p95 observado se lanza una segunda
+  y gana la primera que responda.
+- stream(): la variante por chunks (generate_content_stream), sin singleflight ni
+  hedging porque cada llamador consume su propio stream.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from api.config import settings
+from api.metrics import LLM_COALESCED_WAIT, LLM_LATENCY, observe
+
+logger = logging.getLogger("llm_gateway")
+
+# Mínimo de muestras de latencia antes de empezar a hacer hedging
+_HEDGE_MIN_SAMPLES = 20
+
+
+class LLMUnavailableError(Exception):
+    pass
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency: int = 16, hedge_enabled: bool = False, hedge_percentile: float = 0.95):
+        self.max_concurrency = max_concurrency
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+        self.coalesced = 0
+        self.hedged = 0
+
+    def client(self):
+        """
+        Cliente genai compartido (se crea en el primer uso).
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        from google import genai
+                    except Exception as e:
+                        logger.exception("genai import failed")
+                        raise LLMUnavailableError("La librería genai no está disponible.") from e
+                    self._client = genai.Client(api_key=settings.GENAI_API_KEY)
+        return self._client
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Se crea perezosamente para quedar atado al event loop que lo usa
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._sem
+
+    def _record_latency(self, model: str, elapsed: float) -> None:
+        self._latencies.setdefault(model, deque(maxlen=200)).append(elapsed)
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        if not self.hedge_enabled:
+            return None
+        samples = self._latencies.get(model)
+        if not samples or len(samples) < _HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile))]
+
+    async def _upstream(self, model: str, prompt: str) -> str:
+        client = self.client()
+        async with self._semaphore():
+            start = time.perf_counter()
+            response = await client.aio.models.generate_content(model=model, contents=prompt)
+            self._record_latency(model, time.perf_counter() - start)
+        return getattr(response, "text", None) or str(response)
+
+    async def _call_once(self, model: str, prompt: str, kind: str, deadline: Optional[float]) -> str:
+        # Una observación por request al upstream (los llamadores coalescidos no suman)
+        timeout = None if deadline is None else max(0.0, deadline - asyncio.get_running_loop().time())
+        with observe(LLM_LATENCY, kind=kind):
+            return await asyncio.wait_for(self._upstream(model, prompt), timeout=timeout)
+
+    async def _call_hedged(self, model: str, prompt: str, kind: str, deadline: Optional[float]) -> str:
+        delay = self._hedge_delay(model)
+        if delay is None:
+            return await self._call_once(model, prompt, kind, deadline)
+
+        first = asyncio.create_task(self._call_once(model, prompt, kind, deadline))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            # Sin hedging si ya terminó o si el upstream está saturado
+            if done or self._semaphore().locked():
+                return await first
+
+            self.hedged += 1
+            logger.info("Hedging LLM call after %.2fs", delay)
+            tasks.add(asyncio.create_task(self._call_once(model, prompt, kind, deadline)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # También si este llamador se cancela (timeout externo, cliente que corta):
+            # ninguna llamada al upstream queda huérfana ocupando el semáforo
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _on_done(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Marca la excepción como leída aunque todos los llamadores se hayan cancelado
+        if not task.cancelled():
+            task.exception()
+
+    async def generate(
+        self,
+        prompt: str,
+        model: str = "gemini-2.5-flash",
+        timeout: Optional[float] = None,
+        kind: str = "otro",
+    ) -> str:
+        """
+        Devuelve el texto generado. Lanza asyncio.TimeoutError si vence `timeout`,
+        LLMUnavailableError si falta la librería, o la excepción del upstream.
+        `kind` (sql | receta) etiqueta la métrica de latencia.
+        """
+        key = (model, prompt)
+        task = self._inflight.get(key)
+        if task is None:
+            deadline = None if timeout is None else asyncio.get_running_loop().time() + timeout
+            task = asyncio.create_task(self._call_hedged(model, prompt, kind, deadline))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+            # shield: si un llamador se cancela, la llamada compartida sigue para los demás
+            return await asyncio.shield(task)
+        self.coalesced += 1
+        with observe(LLM_COALESCED_WAIT, kind=kind):
+            return await asyncio.shield(task)
+
+    async def stream(
+        self,
+        prompt: str,
+        model: str = "gemini-2.5-flash",
+        timeout: Optional[float] = None,
+        kind: str = "otro",
+    ) -> AsyncIterator[str]:
+        """
+        Devuelve el texto a medida que lo genera el modelo. `timeout` es el plazo de
+        la respuesta completa; al vencer lanza asyncio.TimeoutError.
+        """
+        client = self.client()
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        def restante() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - loop.time())
+
+        with observe(LLM_LATENCY, kind=kind):
+            async with self._semaphore():
+                chunks = await asyncio.wait_for(
+                    client.aio.models.generate_content_stream(model=model, contents=prompt),
+                    timeout=restante(),
+                )
+                it = chunks.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(it.__anext__(), timeout=restante())
+                    except StopAsyncIteration:
+                        break
+                    text = getattr(chunk, "text", None)
+                    if text:
+                        yield text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "hedged": self.hedged,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+gateway = LLMGateway(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    hedge_enabled=settings.LLM_HEDGE_ENABLED,
+)
@@ -0,0 +1,271 @@
+"""
+Traductor por reglas de preguntas frecuentes de /ask a SQL (sin LLM).
+
+Cubre las plantillas más comunes:
+- ranking: "¿qué alimento tiene más hierro?", "los 5 alimentos con menos calorías"
+- umbrales: "menos de 300 kcal", "más de 10 g de proteína", "entre 5 y 10 de fibra"
+  (la unidad, si viene, se convierte a la de la columna; "1.500" es mil quinientos
+  y la coma es el separador decimal)
+- cualitativos: "alto en proteína y bajo en grasa" (umbrales por 100 g en UMBRALES)
+
+Sólo responde si entiende la pregunta entera: cualquier palabra que no sea un
+nutriente del léxico, un patrón reconocido o una palabra de relleno hace que
+devuelva None y la pregunta va al LLM. La SQL que devuelve pasa igual por
+_validate_sql.
+"""
+
+import re
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from api.db.text_index import fold
+from api.services.sql_validator import ALLOWED_COLUMNS
+
+# Sinónimos (ya sin acentos ni mayúsculas) -> columna
+LEXICO: Dict[str, str] = {
+    "calorias": "energ_kcal", "caloria": "energ_kcal", "kcal": "energ_kcal",
+    "kilocalorias": "energ_kcal", "energia": "energ_kcal",
+    "proteina": "protein", "proteinas": "protein",
+    "grasa": "lipid_tot", "grasas": "lipid_tot", "lipidos": "lipid_tot",
+    "grasa total": "lipid_tot", "grasas totales": "lipid_tot",
+    "grasa saturada": "fa_sat", "grasas saturadas": "fa_sat",
+    "grasa monoinsaturada": "fa_mono", "grasas monoinsaturadas": "fa_mono",
+    "grasa poliinsaturada": "fa_poly", "grasas poliinsaturadas": "fa_poly",
+    "carbohidratos": "carbohydrt", "carbohidrato": "carbohydrt",
+    "hidratos de carbono": "carbohydrt", "hidratos": "carbohydrt",
+    "fibra": "fiber_td", "fibra dietetica": "fiber_td",
+    "calcio": "calcium",
+    "hierro": "iron", "hierro hemo": "ironhem", "hierro hem": "ironhem",
+    "hierro no hemo": "ironnohem", "hierro no hem": "ironnohem",
+    "zinc": "zinc", "cinc": "zinc",
+    "vitamina c": "vit_c", "acido ascorbico": "vit_c",
+    "tiamina": "thiamin", "vitamina b1": "thiamin",
+    "riboflavina": "riboflavin", "vitamina b2": "riboflavin",
+    "niacina": "niacin", "vitamina b3": "niacin",
+    "acido pantotenico": "panto_acid", "vitamina b5": "panto_acid",
+    "vitamina b6": "vit_b6",
+    "acido folico": "folic_acid", "folato": "folate_dfe", "folatos": "folate_dfe",
+    "vitamina b12": "vit_b12",
+    "vitamina a": "vit_a_rae",
+    "vitamina e": "vit_e",
+    "vitamina d": "vit_d_iu",
+    "vitamina k": "vit_k",
+    "colesterol": "chole",
+}
+
+# Umbrales por 100 g para "alto en" / "bajo en" (None: no se interpreta, va al LLM).
+# Criterios tipo Codex: "alto" ~ 30 % del valor de referencia en micronutrientes.
+UMBRALES: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+    "protein": (10, 3),
+    "lipid_tot": (17.5, 3),
+    "fa_sat": (5, 1.5),
+    "carbohydrt": (30, 5),
+    "energ_kcal": (400, 40),
+    "fiber_td": (6, 1.5),
+    "chole": (None, 20),
+    "calcium": (300, None),
+    "iron": (4.2, None),
+    "zinc": (3, None),
+    "vit_c": (24, None),
+}
+
+# Unidad de cada columna (valores por 100 g, como en la tabla USDA)
+UNIDADES: Dict[str, str] = {
+    "energ_kcal": "kcal", "vit_d_iu": "UI",
+    "protein": "g", "lipid_tot": "g", "carbohydrt": "g", "fiber_td": "g",
+    "fa_sat": "g", "fa_mono": "g", "fa_poly": "g",
+    "calcium": "mg", "iron": "mg", "ironhem": "mg", "ironnohem": "mg", "zinc": "mg",
+    "vit_c": "mg", "thiamin": "mg", "riboflavin": "mg", "niacin": "mg",
+    "panto_acid": "mg", "vit_b6": "mg", "vit_e": "mg", "chole": "mg",
+    "folic_acid": "mcg", "food_folate": "mcg", "folate_dfe": "mcg", "vit_b12": "mcg",
+    "vit_a_rae": "mcg", "vit_k": "mcg",
+}
+
+# Unidad escrita -> (unidad, potencia de 10 respecto del gramo)
+_MASAS: Dict[str, Tuple[str, int]] = {
+    "g": ("g", 0), "gr": ("g", 0), "grs": ("g", 0), "gramo": ("g", 0), "gramos": ("g", 0),
+    "mg": ("mg", -3), "miligramo": ("mg", -3), "miligramos": ("mg", -3),
+    "mcg": ("mcg", -6), "ug": ("mcg", -6), "microgramo": ("mcg", -6), "microgramos": ("mcg", -6),
+}
+_EXPONENTE = {"g": 0, "mg": -3, "mcg": -6}
+
+# Palabras que pueden sobrar sin cambiar el sentido de la pregunta
+RELLENO = {
+    "dame", "dime", "decime", "mostrame", "muestrame", "listame", "lista", "quiero",
+    "necesito", "busco", "buscame", "busca", "cual", "cuales", "que", "son", "es",
+    "el", "la", "los", "las", "lo", "un", "una", "unos", "unas", "alimento",
+    "alimentos", "comida", "comidas", "tiene", "tienen", "tenga", "tengan",
+    "contiene", "contienen", "con", "de", "del", "en", "y", "por", "favor", "hay",
+    "me", "todos", "cantidad", "contenido", "aporte", "nivel", "niveles",
+}
+
+_NUM = r"(\d+(?:\.\d+)?)"
+_COL = r"@(\w+)"
+_UNIDAD = r"(?:\s*(" + "|".join(sorted(_MASAS, key=len, reverse=True)) + r")\b)?"
+_MAS = r"(?:mas|mayor|mayores|superior|superiores|arriba)"
+_MENOS = r"(?:menos|menor|menores|inferior|inferiores|debajo|hasta|maximo)"
+
+_ALTO = re.compile(r"\b(?:alto|alta|altos|altas|rico|rica|ricos|ricas)\s+en\s+(@\w+(?:\s+(?:y\s+)?@\w+)*)")
+_BAJO = re.compile(r"\b(?:bajo|baja|bajos|bajas|pobre|pobres)\s+en\s+(@\w+(?:\s+(?:y\s+)?@\w+)*)")
+_ENTRE = re.compile(rf"\bentre\s+{_NUM}\s+y\s+{_NUM}{_UNIDAD}(?:\s+(?:de|en))?\s+{_COL}")
+_MAS_DE_N = re.compile(rf"\b{_MAS}\s+(?:de|a|que)\s+{_NUM}{_UNIDAD}(?:\s+(?:de|en))?\s+{_COL}")
+_MENOS_DE_N = re.compile(rf"\b{_MENOS}\s+(?:de|a|que)?\s*{_NUM}{_UNIDAD}(?:\s+(?:de|en))?\s+{_COL}")
+_COL_MAS_N = re.compile(rf"{_COL}\s+{_MAS}\s+(?:a|de|que)\s+{_NUM}{_UNIDAD}")
+_COL_MENOS_N = re.compile(rf"{_COL}\s+{_MENOS}\s+(?:a|de|que)\s+{_NUM}{_UNIDAD}")
+_RANKING = re.compile(
+    rf"\b(mas|mayor|menos|menor)(?:\s+(?:cantidad|contenido|aporte)\s+de)?\s+{_COL}"
+)
+_POR_100 = re.compile(r"\b(?:por|cada)\s+100\s*(?:g|gr|grs|gramos)\b")
+_TOP = re.compile(rf"\b(?:top|primeros|primeras|los|las)?\s*(\d+)\s+(?:alimentos|comidas)\b")
+_SINGULAR = re.compile(r"\b(?:que|cual)(?:\s+es)?(?:\s+el)?\s+(?:alimento|comida)\b")
+
+_MILES = re.compile(r"(?<![\d.])[1-9]\d{0,2}(?:\.\d{3})+(?![\d.])")
+
+_SINONIMOS = re.compile(
+    r"\b(" + "|".join(re.escape(s) for s in sorted(LEXICO, key=len, reverse=True)) + r")\b"
+)
+
+
+def _normalizar(question: str) -> str:
+    txt = fold(question)
+    # Puntos de miles (1.500 -> 1500) y coma decimal (2,5 -> 2.5)
+    txt = _MILES.sub(lambda m: m.group(0).replace(".", ""), txt)
+    txt = re.sub(r"(\d),(\d)", r"\1.\2", txt)
+    txt = re.sub(r"[¿?¡!,;:\"'()]", " ", txt)
+    txt = re.sub(r"\.(?!\d)", " ", txt)
+    txt = _SINONIMOS.sub(lambda m: "@" + LEXICO[m.group(1)], txt)
+    return " ".join(txt.split())
+
+
+def _num(valor: str) -> str:
+    return str(float(valor)).removesuffix(".0")
+
+
+def _valor(numero: str, unidad: Optional[str], col: str) -> Optional[str]:
+    """
+    Número en la unidad de la columna, o None si la unidad no se puede convertir
+    (miligramos de calorías, gramos de vitamina D en UI).
+    """
+    if unidad is None:
+        return _num(numero)
+    destino = _EXPONENTE.get(UNIDADES.get(col, ""))
+    if destino is None:
+        return None
+    valor = Decimal(numero).scaleb(_MASAS[unidad][1] - destino).normalize()
+    return format(valor, "f")
+
+
+def parse_question(question: str, max_results: Optional[int] = None) -> Optional[str]:
+    """
+    SQL para la pregunta, o None si no encaja con confianza en ninguna plantilla.
+    """
+    txt = _normalizar(question)
+    condiciones: List[str] = []
+    orden: Optional[Tuple[str, str]] = None
+    limite = max_results
+
+    def consumir(patron: re.Pattern, fn) -> None:
+        # Interpreta cada ocurrencia y la saca del texto
+        nonlocal txt
+        for m in patron.finditer(txt):
+            fn(m)
+        txt = patron.sub(" ", txt)
+
+    # "por 100 g" es la base de todos los valores de la tabla: no agrega nada
+    consumir(_POR_100, lambda m: None)
+
+    # Si la cantidad la pide la pregunta ("qué alimento", "los 5 alimentos")
+    singular = bool(_SINGULAR.search(txt))
+    cantidad_pedida = singular
+    if singular:
+        limite = 1
+
+    cantidad_invalida = False
+
+    def top(m):
+        nonlocal limite, cantidad_pedida, cantidad_invalida
+        limite = int(m.group(1))
+        cantidad_pedida = True
+        # "0 alimentos" daría LIMIT 0 (y un 404): mejor que lo interprete el LLM
+        if limite < 1:
+            cantidad_invalida = True
+    consumir(_TOP, top)
+
+    # Umbrales "más/menos de N": columna y sentido en que ordenar si hace falta
+    umbrales: List[Tuple[str, str]] = []
+    unidad_invalida = False
+
+    def comparar(col: str, op: str, *numeros_y_unidad) -> None:
+        nonlocal unidad_invalida
+        *numeros, unidad = numeros_y_unidad
+        valores = [_valor(n, unidad, col) for n in numeros]
+        if None in valores:
+            unidad_invalida = True
+            return
+        if op == "entre":
+            lo, hi = sorted(valores, key=float)
+            condiciones.append(f"{col} >= {lo} AND {col} <= {hi}")
+            return
+        condiciones.append(f"{col} {op} {valores[0]}")
+        umbrales.append((col, "DESC" if op == ">=" else "ASC"))
+
+    consumir(_ENTRE, lambda m: comparar(m.group(4), "entre", m.group(1), m.group(2), m.group(3)))
+    consumir(_MAS_DE_N, lambda m: comparar(m.group(3), ">=", m.group(1), m.group(2)))
+    consumir(_MENOS_DE_N, lambda m: comparar(m.group(3), "<=", m.group(1), m.group(2)))
+    consumir(_COL_MAS_N, lambda m: comparar(m.group(1), ">=", m.group(2), m.group(3)))
+    consumir(_COL_MENOS_N, lambda m: comparar(m.group(1), "<=", m.group(2), m.group(3)))
+
+    rankings: List[Tuple[str, str]] = []
+    consumir(_RANKING, lambda m: rankings.append(
+        (m.group(2), "DESC" if m.group(1) in ("mas", "mayor") else "ASC")
+    ))
+
+    cualitativos: List[Tuple[str, str]] = []
+    faltan_umbrales = False
+
+    def cualitativo(m, alto: bool):
+        nonlocal faltan_umbrales
+        for col in re.findall(r"@(\w+)", m.group(1)):
+            umbral = UMBRALES.get(col, (None, None))[0 if alto else 1]
+            if umbral is None:
+                faltan_umbrales = True
+                continue
+            condiciones.append(f"{col} {'>=' if alto else '<='} {_num(str(umbral))}")
+            cualitativos.append((col, "DESC" if alto else "ASC"))
+    consumir(_ALTO, lambda m: cualitativo(m, True))
+    consumir(_BAJO, lambda m: cualitativo(m, False))
+
+    # Todo lo que queda tiene que ser relleno (y ningún nutriente suelto)
+    sobrantes = [t for t in txt.split() if t not in RELLENO]
+    if sobrantes or faltan_umbrales or unidad_invalida or cantidad_invalida or len(rankings) > 1:
+        return None
+    if not condiciones and not rankings:
+        return None
+
+    columnas = {c.split()[0] for c in condiciones} | {c for c, _ in rankings}
+    if not columnas <= ALLOWED_COLUMNS:
+        return None
+
+    if rankings:
+        orden = rankings[0]
+        condiciones.append(f"{orden[0]} IS NOT NULL")
+    elif cualitativos:
+        # Como en los ejemplos del prompt: "alto en X" ordena por X
+        altos = [c for c in cualitativos if c[1] == "DESC"]
+        orden = (altos or cualitativos)[0]
+    elif umbrales and cantidad_pedida:
+        # "¿Qué alimento tiene más de 10 g de proteína?": el LIMIT lo pidió la
+        # pregunta, así que se devuelven los que más se alejan del umbral
+        orden = umbrales[0]
+    elif singular:
+        # Un LIMIT 1 sin ORDER BY devuelve una fila cualquiera
+        return None
+
+    sql = "SELECT * FROM alimentos"
+    if condiciones:
+        sql += " WHERE " + " AND ".join(condiciones)
+    if orden is not None:
+        sql += f" ORDER BY {orden[0]} {orden[1]}"
+    if limite is not None:
+        sql += f" LIMIT {int(limite)}"
+    return sql
@@ -1,24 +1,69 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from api.cache import PersistentCache
 from api.db.repositories.alimento_repo import get_by_codigos
+from api.services.llm_gateway import gateway, LLMUnavailableError
 from api.config import settings
+import asyncio
+import hashlib
+import json
+import random
+import numpy as np
+import logging
+
+logger = logging.getLogger("receta")
 
 class RecetaError(Exception):
     pass
 
-def generar_receta_llm(ingredientes: List[Dict[str, Any]], modelo: str = "gemini-2.5-flash") -> Dict[str, Any]:
+# Cache conjunto de ingredientes -> variantes de receta del LLM (sin la nutrición,
+# que se recalcula siempre con el catálogo actual)
+receta_cache: Optional[PersistentCache] = None
+if settings.RECETA_CACHE_ENABLED:
+    receta_cache = PersistentCache(
+        "receta",
+        path=settings.LLM_CACHE_PATH,
+        max_entries=settings.RECETA_CACHE_MAX_ENTRIES,
+        ttl=settings.RECETA_CACHE_TTL,
+    )
+
+def _receta_cache_key(ingredientes: List[Dict[str, Any]]) -> str:
     """
-    ingredientes: [{"nombre": "haba", "cantidad_g": 100}, ...]
-    Devuelve receta con título, instrucciones, lista de ingredientes y nutrición total.
+    Forma canónica del pedido: códigos ordenados con la cantidad redondeada a
+    RECETA_CACHE_RESOLUCION_G (102 g y 98 g de lo mismo comparten receta).
     """
-    try:
-        from google import genai
-    except ImportError:
-        raise RecetaError("No se puede importar genai. Instalá la librería.")
+    resolucion = settings.RECETA_CACHE_RESOLUCION_G
+
+    def cubeta(cantidad: float):
+        return int(round(float(cantidad) / resolucion)) if resolucion > 0 else float(cantidad)
+
+    canon = sorted((int(i["nutricion"]["codigomex2"]), cubeta(i["cantidad_g"])) for i in ingredientes)
+    return hashlib.sha256(json.dumps(canon).encode("utf-8")).hexdigest()
+
+async def _buscar_variante(key: str) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    (variante al azar, variantes guardadas). La variante es None mientras no se
+    juntaron RECETA_CACHE_VARIANTES, para que se genere una nueva.
+    """
+    if receta_cache is None:
+        return None, []
+    variantes = await receta_cache.aget(key) or []
+    if len(variantes) < max(1, settings.RECETA_CACHE_VARIANTES):
+        return None, variantes
+    return dict(random.choice(variantes)), variantes
 
-    client = genai.Client(api_key=settings.GENAI_API_KEY)
+async def _guardar_variante(key: str, variantes: List[Dict[str, Any]], receta: Dict[str, Any]) -> None:
+    if receta_cache is None:
+        return
+    variante = {k: v for k, v in receta.items() if k != "nutricion_total"}
+    await receta_cache.aset(key, (variantes + [variante])[-max(1, settings.RECETA_CACHE_VARIANTES):])
 
+async def generar_receta_llm(ingredientes: List[Dict[str, Any]], modelo: str = "gemini-2.5-flash") -> Dict[str, Any]:
+    """
+    ingredientes: [{"nombre": "haba", "cantidad_g": 100}, ...]
+    Devuelve receta con título, instrucciones, lista de ingredientes y nutrición total.
+    """
     # Preparamos la lista para el prompt
-    ingredientes_txt = "\n".join([f"{i['cantidad_g']}g de {i['nombre']}" for i in ingredientes])
+    ingredientes_txt = _ingredientes_txt(ingredientes)
 
     prompt = f"""
     Eres un chef que genera recetas inventadas pero consistentes.
@@ -39,15 +84,14 @@ def generar_receta_llm(ingredientes: List[Dict[str, Any]], modelo: str = "gemini
     }}
     """
     try:
-        response = client.models.generate_content(model=modelo, contents=prompt)
+        text = await gateway.generate(prompt, model=modelo, timeout=settings.REQUEST_TIMEOUT, kind="receta")
+    except asyncio.TimeoutError:
+        raise RecetaError("El LLM tardó demasiado en generar la receta")
+    except LLMUnavailableError:
+        raise RecetaError("No se puede importar genai. Instalá la librería.")
     except Exception as e:
         raise RecetaError("Error llamando al LLM") from e
 
-    # Extraemos texto
-    text = getattr(response, "text", str(response))
-
-    import json
-
     text_clean = text.strip()
     if text_clean.startswith("```json"):
         text_clean = text_clean[7:]
@@ -62,39 +106,215 @@ def generar_receta_llm(ingredientes: List[Dict[str, Any]], modelo: str = "gemini
 
     return receta_json
 
-def crear_receta(ingredientes_codigos: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    1. Consultamos los alimentos en DB
-    2. Creamos objeto con nombre y cantidad
-    3. Llamamos a LLM para generar receta
-    4. Calculamos nutrición total sumando nutrientes proporcional a cantidad
-    """
-    codigos = [i["codigomex2"] for i in ingredientes_codigos]
-    alimentos = get_by_codigos(codigos)  # devuelve lista de dicts con columnas de nutrición
+def _ingredientes_txt(ingredientes: List[Dict[str, Any]]) -> str:
+    return "\n".join([f"{i['cantidad_g']}g de {i['nombre']}" for i in ingredientes])
 
-    if not alimentos:
-        raise RecetaError("No se encontraron alimentos con esos códigos.")
+# Nutrientes del total de la receta -> columna de la tabla
+NUTRIENTES_RECETA = {
+    "energ_kcal": "energ_kcal",
+    "protein": "protein",
+    "fat": "lipid_tot",
+    "carbs": "carbohydrt",
+}
 
-    # Asociamos cantidad a cada alimento
+def _armar_ingredientes(ingredientes_codigos: List[Dict[str, Any]], por_codigo: Dict[int, dict]) -> List[Dict[str, Any]]:
+    """
+    Asocia cantidad a cada alimento encontrado (los códigos inexistentes se ignoran).
+    """
     ingredientes = []
     for i in ingredientes_codigos:
-        alimento = next((a for a in alimentos if a["codigomex2"] == i["codigomex2"]), None)
+        alimento = por_codigo.get(i["codigomex2"])
         if alimento:
             cantidad = i.get("cantidad_g", 100)
             ingredientes.append({"nombre": alimento["nombre_del_alimento"], "cantidad_g": cantidad, "nutricion": alimento})
+    return ingredientes
+
+def calcular_nutricion_batch(recetas: List[List[Dict[str, Any]]]) -> List[Dict[str, float]]:
+    """
+    Nutrición total de varias recetas en una sola pasada vectorizada.
+    Cada receta es la lista que devuelve _armar_ingredientes.
+    """
+    columnas = list(NUTRIENTES_RECETA.values())
+    filas = [ing for receta in recetas for ing in receta]
+    receta_idx = np.fromiter((r for r, receta in enumerate(recetas) for _ in receta), dtype=np.int64, count=len(filas))
+    factores = np.fromiter((ing["cantidad_g"] / 100 for ing in filas), dtype=np.float64, count=len(filas))
+    valores = np.array(
+        [[float(ing["nutricion"].get(c) or 0) for c in columnas] for ing in filas],
+        dtype=np.float64,
+    ).reshape(len(filas), len(columnas))
+
+    totales = np.zeros((len(recetas), len(columnas)), dtype=np.float64)
+    np.add.at(totales, receta_idx, valores * factores[:, None])
+    return [
+        {k: round(float(v), 2) for k, v in zip(NUTRIENTES_RECETA, fila)}
+        for fila in totales
+    ]
+
+async def preparar_receta(ingredientes_codigos: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """
+    La parte de la receta que no depende del LLM: consulta los alimentos, arma los
+    ingredientes con su cantidad y calcula la nutrición total.
+    """
+    codigos = [i["codigomex2"] for i in ingredientes_codigos]
+    alimentos = await get_by_codigos(codigos)  # devuelve lista de dicts con columnas de nutrición
+
+    if not alimentos:
+        raise RecetaError("No se encontraron alimentos con esos códigos.")
+
+    ingredientes = _armar_ingredientes(ingredientes_codigos, {a["codigomex2"]: a for a in alimentos})
+    return ingredientes, calcular_nutricion_batch([ingredientes])[0]
+
+async def generar_receta_cacheada(ingredientes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    generar_receta_llm pasando por el cache de recetas.
+    """
+    key = _receta_cache_key(ingredientes)
+    receta, variantes = await _buscar_variante(key)
+    if receta is not None:
+        return receta
+    receta = await generar_receta_llm(ingredientes)
+    await _guardar_variante(key, variantes, receta)
+    return receta
 
-    # Preparamos lista para prompt LLM
-    receta = generar_receta_llm(ingredientes)
+async def crear_receta(ingredientes_codigos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    1. Consultamos los alimentos en DB
+    2. Creamos objeto con nombre y cantidad
+    3. Llamamos a LLM para generar receta
+    4. Calculamos nutrición total sumando nutrientes proporcional a cantidad
+    """
+    ingredientes, nutricion = await preparar_receta(ingredientes_codigos)
 
-    # Calculamos nutrición total real sumando nutrientes proporcional a cantidad
-    nutricion_total = {"energ_kcal": 0, "protein": 0, "fat": 0, "carbs": 0}
-    for ing in ingredientes:
-        factor = ing["cantidad_g"] / 100
-        nutricion_total["energ_kcal"] += float(ing["nutricion"].get("energ_kcal") or 0) * factor
-        nutricion_total["protein"] += float(ing["nutricion"].get("protein") or 0) * factor
-        nutricion_total["fat"] += float(ing["nutricion"].get("lipid_tot") or 0) * factor
-        nutricion_total["carbs"] += float(ing["nutricion"].get("carbohydrt") or 0) * factor
+    # Preparamos lista para prompt LLM (o reusamos una receta del mismo conjunto)
+    receta = await generar_receta_cacheada(ingredientes)
 
-    receta["nutricion_total"] = {k: round(v, 2) for k, v in nutricion_total.items()}
+    # Nutrición total real sumando nutrientes proporcional a cantidad (no la del LLM)
+    receta["nutricion_total"] = nutricion
 
     return receta
+
+def _limpiar_titulo(linea: str) -> str:
+    # El modelo a veces decora el título con markdown o un prefijo
+    titulo = linea.strip().lstrip("#").strip().strip("*").strip()
+    if titulo.lower().startswith("título:") or titulo.lower().startswith("titulo:"):
+        titulo = titulo.split(":", 1)[1].strip()
+    return titulo
+
+async def stream_receta(
+    ingredientes: List[Dict[str, Any]],
+    nutricion: Dict[str, float],
+    modelo: str = "gemini-2.5-flash",
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Receta por eventos (evento, datos), para /receta/stream:
+    - "nutricion": ingredientes y nutrición total, antes de llamar al LLM
+    - "titulo": la primera línea que genera el modelo
+    - "instrucciones": cada fragmento nuevo de las instrucciones ({"delta": ...})
+    - "fin": la receta completa, con el mismo formato que POST /receta
+    - "error": si el LLM falla a mitad de camino
+    """
+    lista = [f"{i['cantidad_g']:g}g {i['nombre']}" for i in ingredientes]
+    yield "nutricion", {
+        "ingredientes": [
+            {"codigomex2": i["nutricion"]["codigomex2"], "nombre": i["nombre"], "cantidad_g": i["cantidad_g"]}
+            for i in ingredientes
+        ],
+        "nutricion_total": nutricion,
+    }
+
+    key = _receta_cache_key(ingredientes)
+    cacheada, variantes = await _buscar_variante(key)
+    if cacheada is not None:
+        yield "titulo", {"titulo": cacheada.get("titulo")}
+        yield "instrucciones", {"delta": cacheada.get("instrucciones", "")}
+        cacheada["nutricion_total"] = nutricion
+        yield "fin", cacheada
+        return
+
+    # Texto plano en lugar de JSON: el título y las instrucciones se pueden mostrar
+    # a medida que llegan
+    prompt = f"""
+    Eres un chef que genera recetas inventadas pero consistentes.
+    Recibís la siguiente lista de ingredientes con cantidades:
+    {_ingredientes_txt(ingredientes)}
+
+    Respondé en texto plano, sin JSON ni markdown:
+    en la primera línea sólo el nombre de la receta, y a partir de la segunda línea
+    las instrucciones de preparación paso a paso.
+    """
+    titulo = None
+    buffer = ""
+    instrucciones = []
+    try:
+        async for texto in gateway.stream(prompt, model=modelo, timeout=settings.REQUEST_TIMEOUT, kind="receta"):
+            if titulo is None:
+                buffer += texto
+                if "\n" not in buffer:
+                    continue
+                linea, texto = buffer.split("\n", 1)
+                titulo = _limpiar_titulo(linea)
+                yield "titulo", {"titulo": titulo}
+                texto = texto.lstrip("\n")
+            if texto:
+                instrucciones.append(texto)
+                yield "instrucciones", {"delta": texto}
+    except asyncio.TimeoutError:
+        yield "error", {"detail": "El LLM tardó demasiado en generar la receta"}
+        return
+    except LLMUnavailableError:
+        yield "error", {"detail": "No se puede importar genai. Instalá la librería."}
+        return
+    except Exception:
+        logger.exception("Error en el stream de la receta")
+        yield "error", {"detail": "Error llamando al LLM"}
+        return
+
+    if titulo is None:
+        # Respuesta de una sola línea: es el título
+        titulo = _limpiar_titulo(buffer)
+        yield "titulo", {"titulo": titulo}
+
+    receta = {
+        "titulo": titulo,
+        "ingredientes": lista,
+        "instrucciones": "".join(instrucciones).strip(),
+        "nutricion_total": nutricion,
+    }
+    await _guardar_variante(key, variantes, receta)
+    yield "fin", receta
+
+async def crear_recetas_batch(recetas_codigos: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Genera varias recetas a la vez:
+    1. Una sola consulta con la unión de todos los códigos
+    2. Nutrición de todas las recetas en una pasada vectorizada
+    3. Llamadas al LLM en paralelo, con tope RECETA_BATCH_CONCURRENCY
+    Devuelve resultados parciales: cada ítem trae "receta" o "error".
+    """
+    codigos = sorted({i["codigomex2"] for receta in recetas_codigos for i in receta})
+    alimentos = await get_by_codigos(codigos)
+    por_codigo = {a["codigomex2"]: a for a in alimentos}
+
+    recetas = [_armar_ingredientes(r, por_codigo) for r in recetas_codigos]
+    nutriciones = calcular_nutricion_batch(recetas)
+
+    sem = asyncio.Semaphore(settings.RECETA_BATCH_CONCURRENCY)
+
+    async def generar(indice: int) -> Dict[str, Any]:
+        ingredientes = recetas[indice]
+        if not ingredientes:
+            return {"indice": indice, "error": "No se encontraron alimentos con esos códigos."}
+        try:
+            async with sem:
+                receta = await generar_receta_cacheada(ingredientes)
+            receta["nutricion_total"] = nutriciones[indice]
+        except RecetaError as e:
+            return {"indice": indice, "error": str(e)}
+        except Exception:
+            logger.exception("Error generando la receta %d del batch", indice)
+            return {"indice": indice, "error": "Error interno"}
+        return {"indice": indice, "receta": receta}
+
+    items = await asyncio.gather(*(generar(i) for i in range(len(recetas))))
+    errores = sum(1 for it in items if "error" in it)
+    return {"total": len(items), "exitosas": len(items) - errores, "errores": errores, "resultados": items}
@@ -0,0 +1,256 @@
+"""
+Validador de SQL generado por el LLM basado en el parser de sqlparse.
+
+Recorre los tokens de la sentencia una sola vez y:
+- exige un único SELECT sobre la tabla `alimentos` (sin JOIN, UNION ni comentarios),
+- aplica listas blancas de columnas, funciones y palabras clave,
+- inyecta o recorta el LIMIT de primer nivel,
+- estima un costo estático y rechaza las consultas que superan el presupuesto.
+
+Reglas de costo (en unidades de "lecturas completas de la tabla"):
+- la consulta principal cuesta 1,
+- cada subconsulta a profundidad d suma 10**d (puede ejecutarse una vez por fila
+  de la consulta externa),
+- ORDER BY, GROUP BY y DISTINCT suman 1 cada uno,
+- cada tabla extra en un FROM (FROM alimentos a, alimentos b) es un producto
+  cartesiano y suma CROSS_JOIN_COST * 10**d.
+
+validate_select memoiza el resultado por texto de la sentencia: el recorrido de
+tokens de sqlparse cuesta ~1 ms, y el mismo SQL se revalida seguido (cache de
+/ask, traductor por reglas, lotes).
+"""
+
+from functools import lru_cache
+from typing import List, Optional, Set, Tuple
+
+import sqlparse
+from sqlparse import tokens as T
+
+TABLE = "alimentos"
+
+# Lista blanca de columnas (tu modelo SQLAlchemy)
+ALLOWED_COLUMNS = {
+    "codigomex2", "nombre_del_alimento", "energ_kcal", "carbohydrt", "lipid_tot",
+    "protein", "fiber_td", "calcium", "iron", "ironhem", "ironnohem", "zinc",
+    "vit_c", "thiamin", "riboflavin", "niacin", "panto_acid", "vit_b6",
+    "folic_acid", "food_folate", "folate_dfe", "vit_b12", "vit_a_rae",
+    "vit_e", "vit_d_iu", "vit_k", "fa_sat", "fa_mono", "fa_poly", "chole"
+}
+
+FORBIDDEN_KEYWORDS = {
+    "drop", "delete", "update", "insert", "alter", "truncate", "grant", "revoke",
+    "create", "replace", "merge", "call", "execute"
+}
+
+ALLOWED_FUNCTIONS = {
+    "count", "avg", "min", "max", "sum", "round", "coalesce", "abs", "lower", "upper",
+    "greatest", "least", "nullif", "floor", "ceil", "trunc", "length", "cast", "unaccent",
+}
+
+# Se validan palabra por palabra (sqlparse agrupa "ORDER BY", "NOT NULL", etc.)
+ALLOWED_KEYWORDS = {
+    "FROM", "WHERE", "AND", "OR", "NOT", "IS", "NULL", "IN", "BETWEEN", "LIKE", "ILIKE",
+    "AS", "ORDER", "GROUP", "BY", "HAVING", "LIMIT", "OFFSET", "ASC", "DESC", "DISTINCT",
+    "NULLS", "FIRST", "LAST", "CASE", "WHEN", "THEN", "ELSE", "END", "TRUE", "FALSE",
+    "ALL", "ANY", "EXISTS",
+}
+
+_SET_OPERATIONS = {"UNION", "UNION ALL", "INTERSECT", "EXCEPT"}
+
+SUBQUERY_BASE_COST = 10
+# Un producto cartesiano lee la tabla entera una vez por fila
+CROSS_JOIN_COST = 1000
+
+# Palabras clave que cierran la lista de tablas del FROM
+_FIN_FROM = {"WHERE", "GROUP BY", "ORDER BY", "HAVING", "LIMIT", "OFFSET"}
+
+
+class UnsafeSQLError(Exception):
+    pass
+
+
+def _normalize_keyword(value: str) -> str:
+    return " ".join(value.upper().split())
+
+
+def _identifier(tok) -> Optional[str]:
+    if tok.ttype in T.Name or tok.ttype is T.Name:
+        return tok.value.lower()
+    if tok.ttype in T.Literal.String.Symbol:
+        return tok.value.strip('"').lower()
+    return None
+
+
+def validate_select(sql: str, max_limit: int, cost_budget: float) -> Tuple[str, float]:
+    """
+    Devuelve (sql_normalizada, costo_estimado) o lanza UnsafeSQLError con el motivo.
+    """
+    if not sql or not sql.strip():
+        raise UnsafeSQLError("sentencia vacía")
+    sql_str = sql.strip()
+    if sql_str.endswith(";"):
+        sql_str = sql_str[:-1].strip()
+
+    ok, resultado = _validate_cached(sql_str, max_limit, cost_budget)
+    if not ok:
+        raise UnsafeSQLError(resultado)
+    return resultado
+
+
+@lru_cache(maxsize=1024)
+def _validate_cached(sql_str: str, max_limit: int, cost_budget: float):
+    # lru_cache no guarda excepciones: el rechazo se devuelve como (False, motivo)
+    try:
+        return True, _validate(sql_str, max_limit, cost_budget)
+    except UnsafeSQLError as e:
+        return False, str(e)
+
+
+def _validate(sql_str: str, max_limit: int, cost_budget: float) -> Tuple[str, float]:
+    statements = [s for s in sqlparse.parse(sql_str) if str(s).strip()]
+    if len(statements) != 1:
+        raise UnsafeSQLError("se permite una sola sentencia")
+    stmt = statements[0]
+
+    toks = [t for t in stmt.flatten() if not t.is_whitespace]
+    if not toks or toks[0].ttype is not T.Keyword.DML or toks[0].value.upper() != "SELECT":
+        raise UnsafeSQLError("sólo se permiten SELECT")
+
+    aliases: Set[str] = set()
+    # Pila de paréntesis: True si abre una subconsulta
+    parens: List[bool] = []
+    depth = 0
+    cost = 1.0
+    tables_seen = 0
+    limit_tok = None
+    expect = None  # "table" | "alias" | "limit" | "alias_name"
+    # Por nivel de subconsulta: si estamos dentro de la lista de tablas del FROM
+    in_from: List[bool] = [False]
+
+    for i, tok in enumerate(toks):
+        nxt = toks[i + 1] if i + 1 < len(toks) else None
+        ttype = tok.ttype
+        value = tok.value
+
+        if ttype in T.Comment:
+            raise UnsafeSQLError("no se permiten comentarios")
+
+        if expect == "limit" and ttype not in T.Literal.Number.Integer:
+            raise UnsafeSQLError("LIMIT debe ser un entero")
+
+        if ttype is T.Punctuation:
+            if value == ";":
+                raise UnsafeSQLError("se permite una sola sentencia")
+            if value == "," and in_from[depth]:
+                # Otra tabla en el FROM: producto cartesiano
+                cost += CROSS_JOIN_COST * SUBQUERY_BASE_COST ** depth
+                expect = "table"
+                continue
+            if value == "(":
+                es_sub = nxt is not None and nxt.ttype is T.Keyword.DML
+                parens.append(es_sub)
+                if es_sub:
+                    depth += 1
+                    in_from.append(False)
+                    cost += SUBQUERY_BASE_COST ** depth
+            elif value == ")":
+                if not parens:
+                    raise UnsafeSQLError("paréntesis desbalanceados")
+                if parens.pop():
+                    depth -= 1
+                    in_from.pop()
+            expect = None
+            continue
+
+        if ttype is T.Keyword.DML:
+            if value.upper() != "SELECT":
+                raise UnsafeSQLError(f"operación no permitida: {value}")
+            continue
+
+        if ttype in T.Keyword.DDL or ttype in T.Keyword.DML:
+            raise UnsafeSQLError(f"operación no permitida: {value}")
+
+        if ttype is T.Keyword.Order:
+            continue
+
+        if ttype in T.Keyword:
+            kw = _normalize_keyword(value)
+            if kw in _FIN_FROM:
+                in_from[depth] = False
+            if kw.lower() in FORBIDDEN_KEYWORDS:
+                raise UnsafeSQLError(f"palabra clave prohibida: {kw}")
+            if "JOIN" in kw.split():
+                raise UnsafeSQLError("no se permiten JOIN")
+            if kw in _SET_OPERATIONS:
+                raise UnsafeSQLError(f"no se permite {kw}")
+            if nxt is not None and nxt.value == "(" and kw.lower() in ALLOWED_FUNCTIONS:
+                continue
+            if not all(w in ALLOWED_KEYWORDS for w in kw.split()):
+                raise UnsafeSQLError(f"palabra clave no permitida: {kw}")
+            if kw == "FROM":
+                expect = "table"
+            elif kw == "AS":
+                expect = "alias_name"
+            elif kw == "LIMIT":
+                expect = "limit"
+            elif kw in ("ORDER BY", "GROUP BY", "DISTINCT"):
+                cost += 1
+            else:
+                expect = None
+            continue
+
+        if expect == "limit":
+            if depth == 0:
+                limit_tok = tok
+            expect = None
+            continue
+
+        # Tipos en casts (::numeric) y parámetros (:p)
+        if ttype in T.Name.Builtin or ttype in T.Name.Placeholder:
+            expect = None
+            continue
+
+        name = _identifier(tok)
+        if name is not None:
+            if expect == "table":
+                if name != TABLE:
+                    raise UnsafeSQLError(f"tabla no permitida: {name}")
+                tables_seen += 1
+                in_from[depth] = True
+                expect = "alias"
+                continue
+            if expect in ("alias", "alias_name"):
+                aliases.add(name)
+                expect = None
+                continue
+            if nxt is not None and nxt.value == "(":
+                if name not in ALLOWED_FUNCTIONS:
+                    raise UnsafeSQLError(f"función no permitida: {name}")
+                continue
+            if name not in ALLOWED_COLUMNS and name not in aliases and name != TABLE:
+                # El alias puede usarse antes de definirse (SELECT a.x FROM alimentos a)
+                if nxt is not None and nxt.value == ".":
+                    continue
+                raise UnsafeSQLError(f"columna no permitida: {name}")
+            continue
+
+        if expect == "table":
+            raise UnsafeSQLError("FROM debe apuntar a la tabla alimentos")
+        expect = None
+
+    if parens:
+        raise UnsafeSQLError("paréntesis desbalanceados")
+    if tables_seen == 0:
+        raise UnsafeSQLError("falta FROM alimentos")
+    if cost > cost_budget:
+        raise UnsafeSQLError(f"costo estimado {cost:g} supera el presupuesto {cost_budget:g}")
+
+    # LIMIT de primer nivel: recortar o inyectar
+    if limit_tok is not None:
+        if int(limit_tok.value) > max_limit:
+            limit_tok.value = str(max_limit)
+        out = str(stmt).strip()
+    else:
+        out = str(stmt).strip() + f" LIMIT {int(max_limit)}"
+
+    return out, cost
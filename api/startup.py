@@ -0,0 +1,138 @@
+"""
+Arranque en frío: perfil de tiempos y warm-up.
+
+- StartupProfiler: mide cada etapa (imports de main.py, carga del snapshot, réplica,
+  warm-up) y arma un reporte que se loguea al terminar el startup y se sirve en
+  /health/startup.
+- warm_up(): abre conexiones del pool, crea los clientes de Supabase y Gemini y
+  ejercita los caminos calientes (sqlparse, índice de trigramas) antes de que
+  /health/ready pase a 200, para que el primer request no pague nada de eso.
+
+Este módulo sólo importa la stdlib y settings: main.py lo importa primero para
+poder medir el resto de sus imports.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from api.config import settings
+
+logger = logging.getLogger("startup")
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stages: List[Dict[str, Any]] = []
+        self.finished: Optional[float] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.stages.append({
+                "stage": name,
+                "ms": round((time.perf_counter() - start) * 1000, 1),
+                "ok": ok,
+            })
+
+    def report(self) -> Dict[str, Any]:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            "total_ms": round((end - self.origin) * 1000, 1),
+            "stages": sorted(self.stages, key=lambda s: s["ms"], reverse=True),
+        }
+
+    def finish(self) -> None:
+        """
+        Cierra el perfil (al terminar el arranque) y lo loguea.
+        """
+        self.finished = time.perf_counter()
+        rep = self.report()
+        logger.info("Startup listo en %.1f ms", rep["total_ms"])
+        for s in rep["stages"]:
+            logger.info("  %-28s %8.1f ms%s", s["stage"], s["ms"], "" if s["ok"] else "  (falló)")
+
+
+profiler = StartupProfiler()
+
+
+async def _abrir_pool() -> None:
+    from sqlalchemy import text
+    from api.db.session import get_async_engine
+
+    engine = get_async_engine()
+    if engine is None:
+        return
+    n = min(settings.DB_WARMUP_CONNECTIONS, settings.DB_POOL_SIZE)
+    if n <= 0:
+        return
+
+    # Las conexiones se sostienen a la vez para que el pool abra n distintas
+    conns = []
+    try:
+        for _ in range(n):
+            conns.append(await engine.connect())
+        await asyncio.gather(*(c.execute(text("SELECT 1")) for c in conns))
+    finally:
+        for c in conns:
+            await c.close()
+
+
+async def _cliente_supabase() -> None:
+    from api.db.connection import get_supabase
+
+    await get_supabase()
+
+
+async def _cliente_gemini() -> None:
+    if not settings.GENAI_API_KEY:
+        return
+    from api.services.llm_gateway import gateway
+
+    # El import de google.genai es sincrónico y pesado: fuera del event loop
+    await asyncio.to_thread(gateway.client)
+
+
+def _caminos_calientes() -> None:
+    from api.db.snapshot import snapshot
+    from api.services.asistente_service import _validate_sql
+
+    # sqlparse compila sus expresiones en el primer parseo
+    _validate_sql("SELECT nombre_del_alimento FROM alimentos WHERE protein > 10 LIMIT 5")
+    if snapshot.is_loaded():
+        snapshot.search_nombre("arroz", limit=1)
+        snapshot.search({"min_proteina": 1}, limit=1)
+
+
+async def warm_up() -> None:
+    """
+    Las etapas son independientes y corren en paralelo; si una falla se loguea y se
+    sigue (el monitor de salud es el que decide si la dependencia está caída).
+    """
+    async def etapa(nombre: str, fn) -> None:
+        try:
+            with profiler.stage(nombre):
+                await asyncio.wait_for(fn(), timeout=settings.HEALTH_CHECK_TIMEOUT)
+        except Exception as e:
+            logger.warning("Warm-up %s falló: %s", nombre, e)
+
+    await asyncio.gather(
+        etapa("warmup:pool", _abrir_pool),
+        etapa("warmup:supabase", _cliente_supabase),
+        etapa("warmup:gemini", _cliente_gemini),
+    )
+    try:
+        with profiler.stage("warmup:caches"):
+            _caminos_calientes()
+    except Exception as e:
+        logger.warning("Warm-up de caches falló: %s", e)
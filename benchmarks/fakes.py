@@ -0,0 +1,284 @@
+"""
+Dobles locales para correr la API sin servicios externos (benchmarks).
+
+- FakeSupabase: cliente compatible con el subconjunto de PostgREST que usa el repo
+  (select / eq / gt / gte / lte / in_ / ilike / order / limit / offset / range / insert).
+- Un SQLite en memoria (la misma LocalReplica de /ask) en lugar de execute_sql.
+- FakeGenAI: Gemini determinístico con latencia configurable.
+- Opcionalmente el MemoryBackend del repo en lugar de PostgREST.
+
+`install()` los conecta a los módulos de la API ya importados.
+"""
+
+import asyncio
+import json
+import random
+import re
+from typing import Any, Dict, List, Optional
+
+from api.db.snapshot import NUMERIC_COLUMNS
+
+_PALABRAS = [
+    "ACEITE", "HARINA", "LECHE", "QUESO", "PAN", "ARROZ", "FRIJOL", "HABA", "MAIZ", "TORTILLA",
+    "POLLO", "RES", "CERDO", "ATUN", "HUEVO", "MANZANA", "PLATANO", "NARANJA", "JITOMATE", "CHILE",
+]
+_CALIFICADORES = [
+    "ENTERA", "DESCREMADA", "COCIDO", "CRUDO", "FRITO", "DE ALGODON", "INTEGRAL", "BLANCO",
+    "ROJO", "NEGRO", "EN LATA", "SECO", "FRESCO", "ASADO", "CON SAL",
+]
+
+
+def make_rows(n: int = 2000, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    Catálogo sintético y reproducible con la forma de la tabla `alimentos`.
+    """
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(1, n + 1):
+        row: Dict[str, Any] = {
+            "codigomex2": i,
+            "nombre_del_alimento": f"{rnd.choice(_PALABRAS)} {rnd.choice(_CALIFICADORES)} {i}",
+        }
+        for c in NUMERIC_COLUMNS:
+            # ~10% de nulos, como en el dataset real
+            row[c] = None if rnd.random() < 0.1 else round(rnd.uniform(0, 400), 2)
+        rows.append(row)
+    return rows
+
+
+# --- Supabase / PostgREST -------------------------------------------------
+
+class _Response:
+    def __init__(self, data: List[dict]):
+        self.data = data
+
+
+def _ilike(pattern: str) -> "re.Pattern[str]":
+    partes = (re.escape(p) for p in pattern.split("%"))
+    return re.compile("^" + ".*".join(partes).replace("_", ".") + "$", re.IGNORECASE | re.DOTALL)
+
+
+class _Query:
+    def __init__(self, store: "FakeSupabase"):
+        self._store = store
+        self._filters: List[Any] = []
+        self._order: Optional[tuple] = None
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._insert: Optional[List[dict]] = None
+
+    def select(self, *_columns):
+        return self
+
+    def _cmp(self, col, fn):
+        self._filters.append(lambda r: r.get(col) is not None and fn(r[col]))
+        return self
+
+    def eq(self, col, v):
+        return self._cmp(col, lambda x: x == v)
+
+    def gt(self, col, v):
+        return self._cmp(col, lambda x: x > v)
+
+    def gte(self, col, v):
+        return self._cmp(col, lambda x: x >= v)
+
+    def lte(self, col, v):
+        return self._cmp(col, lambda x: x <= v)
+
+    def in_(self, col, values):
+        values = set(values)
+        return self._cmp(col, lambda x: x in values)
+
+    def ilike(self, col, pattern):
+        rx = _ilike(pattern)
+        return self._cmp(col, lambda x: rx.match(str(x)) is not None)
+
+    def order(self, col, desc=False):
+        self._order = (col, desc)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def offset(self, n):
+        self._offset = n
+        return self
+
+    def range(self, start, end):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def insert(self, rows):
+        self._insert = rows if isinstance(rows, list) else [rows]
+        return self
+
+    async def execute(self) -> _Response:
+        await self._store.sleep()
+        if self._insert is not None:
+            return _Response(self._store.insert(self._insert))
+        rows = [r for r in self._store.rows if all(f(r) for f in self._filters)]
+        if self._order is not None:
+            col, desc = self._order
+            rows.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        end = None if self._limit is None else self._offset + self._limit
+        return _Response([dict(r) for r in rows[self._offset:end]])
+
+
+class FakeSupabase:
+    def __init__(self, rows: List[dict], latency: float = 0.0):
+        self.rows = [dict(r) for r in rows]
+        self.latency = latency
+
+    async def sleep(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def table(self, _name: str) -> _Query:
+        return _Query(self)
+
+    def insert(self, rows: List[dict]) -> List[dict]:
+        existentes = {r["codigomex2"] for r in self.rows}
+        siguiente = max(existentes, default=0) + 1
+        nuevos = []
+        for row in rows:
+            row = dict(row)
+            if row.get("codigomex2") is None:
+                row["codigomex2"] = siguiente
+            if row["codigomex2"] in existentes:
+                raise Exception(f"duplicate key value violates unique constraint (codigomex2={row['codigomex2']})")
+            existentes.add(row["codigomex2"])
+            siguiente = max(siguiente, row["codigomex2"]) + 1
+            nuevos.append(row)
+        self.rows.extend(nuevos)
+        return nuevos
+
+
+# --- Gemini ---------------------------------------------------------------
+
+_SQL_RESPUESTAS = [
+    "SELECT * FROM alimentos WHERE protein >= 10 AND lipid_tot <= 10 ORDER BY protein DESC LIMIT 10",
+    "SELECT * FROM alimentos WHERE iron IS NOT NULL ORDER BY iron DESC LIMIT 1",
+    "SELECT * FROM alimentos WHERE energ_kcal <= 300 LIMIT 20",
+    "```sql\nSELECT * FROM alimentos WHERE nombre_del_alimento ILIKE '%leche%' LIMIT 10;\n```",
+]
+
+
+class _Texto:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Models:
+    def __init__(self, owner: "FakeGenAI"):
+        self._owner = owner
+
+    async def generate_content(self, model: str, contents: str) -> _Texto:
+        await asyncio.sleep(self._owner.next_latency())
+        return _Texto(self._owner.respuesta(contents))
+
+    async def generate_content_stream(self, model: str, contents: str):
+        # Como el SDK: la corutina devuelve un iterador async de chunks. La latencia
+        # se reparte entre el primer chunk (la mayor parte) y el resto.
+        texto = self._owner.respuesta(contents)
+        latencia = self._owner.next_latency()
+        partes = [texto[i:i + 24] for i in range(0, len(texto), 24)] or [""]
+
+        async def chunks():
+            await asyncio.sleep(latencia * 0.5)
+            for parte in partes:
+                yield _Texto(parte)
+                await asyncio.sleep(latencia * 0.5 / len(partes))
+
+        return chunks()
+
+
+class _Aio:
+    def __init__(self, owner: "FakeGenAI"):
+        self.models = _Models(owner)
+
+
+class FakeGenAI:
+    """
+    Respuestas determinísticas según el prompt (SQL para /ask, array JSON para los
+    lotes, JSON para recetas, texto plano para /receta/stream).
+    La latencia es `latency` ± `jitter` segundos con una semilla fija.
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, seed: int = 7):
+        self.latency = latency
+        self.jitter = jitter
+        self._rnd = random.Random(seed)
+        self.aio = _Aio(self)
+
+    def next_latency(self) -> float:
+        return max(0.0, self.latency + self._rnd.uniform(-self.jitter, self.jitter))
+
+    def respuesta(self, prompt: str) -> str:
+        lote = re.search(r"Vas a recibir (\d+) preguntas numeradas", prompt)
+        if lote:
+            # Micro-batching de /ask: un {"n", "sql"} por pregunta
+            return json.dumps([
+                {"n": i, "sql": _SQL_RESPUESTAS[(sum(map(ord, prompt)) + i) % len(_SQL_RESPUESTAS)]}
+                for i in range(1, int(lote.group(1)) + 1)
+            ])
+        if "traductor" in prompt:
+            return _SQL_RESPUESTAS[sum(map(ord, prompt)) % len(_SQL_RESPUESTAS)]
+        if "texto plano" in prompt:
+            # Receta por streaming: título en la primera línea y después las instrucciones
+            return "Receta de prueba\n1. Picar los ingredientes.\n2. Mezclar todo y servir.\n"
+        return "```json\n" + json.dumps({
+            "titulo": "Receta de prueba",
+            "ingredientes": ["100g ingrediente"],
+            "instrucciones": "Mezclar todo y servir.",
+            "nutricion_total": {"energ_kcal": 0, "protein": 0, "fat": 0, "carbs": 0},
+        }) + "\n```"
+
+
+# --- Instalación ----------------------------------------------------------
+
+def _FakeSupabaseBackend():
+    from api.db.repositories.backends import SupabaseBackend
+
+    class _Backend(SupabaseBackend):
+        def is_configured(self) -> bool:
+            return True
+
+    return _Backend()
+
+
+def install(
+    rows: List[dict],
+    supabase_latency: float = 0.0,
+    llm_latency: float = 0.2,
+    llm_jitter: float = 0.0,
+    backend: str = "supabase",
+) -> Dict[str, Any]:
+    """
+    Conecta los dobles a la API. Devuelve los objetos creados por si el llamador
+    quiere inspeccionarlos.
+    """
+    from api.db import connection
+    from api.db.replica import LocalReplica
+    from api.db.repositories.backends import MemoryBackend, set_backend
+    from api.services import asistente_service
+    from api.services.llm_gateway import gateway
+
+    supabase = FakeSupabase(rows, latency=supabase_latency)
+    connection._supabase = supabase
+    # El stub no necesita SUPABASE_URL, así que el backend se fija a mano
+    set_backend(MemoryBackend(rows) if backend == "memory" else _FakeSupabaseBackend())
+
+    # execute_sql contra SQLite en memoria (mismo traductor de dialecto que la réplica)
+    sql_db = LocalReplica(None)
+    sql_db.load(rows)
+
+    async def fake_execute_sql(sql: str, params: Optional[dict] = None, max_retries: int = 3, use_cache: bool = True):
+        return await sql_db.execute(sql, params)
+
+    asistente_service.execute_sql = fake_execute_sql
+
+    genai = FakeGenAI(latency=llm_latency, jitter=llm_jitter)
+    gateway._client = genai
+    return {"supabase": supabase, "sql": sql_db, "genai": genai}
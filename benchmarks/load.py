@@ -0,0 +1,182 @@
+"""
+Prueba de carga de todas las rutas de api/main.py contra los dobles locales.
+
+    python -m benchmarks.load --concurrency 1,8,32 --requests 200 --llm-latency 0.2
+
+Por cada endpoint y nivel de concurrencia reporta throughput (req/s), errores y
+latencias p50/p95/p99 en ms. Corre en proceso con httpx.ASGITransport, así que mide
+la API (routing, validación, serialización, caches) sin red de por medio.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+# Antes de importar la API: cache del asistente sólo en memoria y sin réplica
+os.environ.setdefault("LLM_CACHE_PATH", "")
+os.environ.setdefault("SQL_REPLICA_MODE", "off")
+
+import httpx
+
+from benchmarks import fakes
+
+
+class Endpoint(NamedTuple):
+    nombre: str
+    method: str
+    path: Callable[[int], str]
+    body: Optional[Callable[[int], Any]] = None
+    content_type: Optional[str] = None
+
+
+def _endpoints(n_rows: int) -> List[Endpoint]:
+    codigo = lambda i: 1 + (i * 7919) % n_rows
+    nombres = ["leche", "aceite", "pan", "arroz", "pollo", "queso", "haba", "fri"]
+    return [
+        Endpoint("GET /", "GET", lambda i: "/"),
+        Endpoint("GET /health", "GET", lambda i: "/health"),
+        Endpoint("GET /metrics", "GET", lambda i: "/metrics"),
+        Endpoint("GET /alimentos", "GET", lambda i: f"/alimentos?limit=100&offset={(i * 100) % n_rows}"),
+        Endpoint("GET /alimentos (cursor)", "GET", lambda i: "/alimentos?limit=100&cursor="),
+        Endpoint("GET /alimentos/export", "GET", lambda i: "/alimentos/export?format=ndjson"),
+        Endpoint("GET /alimento/{codigo}", "GET", lambda i: f"/alimento/{codigo(i)}"),
+        Endpoint("GET /alimento/{codigo}/similares", "GET", lambda i: f"/alimento/{codigo(i)}/similares?k=10"),
+        Endpoint("GET /buscar_alimento", "GET", lambda i: f"/buscar_alimento?nombre={nombres[i % len(nombres)]}&limit=50"),
+        Endpoint("POST /buscar", "POST", lambda i: "/buscar?limit=100", lambda i: {"min_proteina": i % 50, "max_calorias": 300}),
+        Endpoint("POST /ask", "POST", lambda i: "/ask", lambda i: {"question": f"alimentos con proteína {i}", "max_results": 10}),
+        Endpoint("POST /receta", "POST", lambda i: "/receta", lambda i: {
+            "ingredientes": [{"codigomex2": codigo(i), "cantidad_g": 100}, {"codigomex2": codigo(i + 1), "cantidad_g": 50}],
+        }),
+        Endpoint("POST /receta/stream", "POST", lambda i: "/receta/stream", lambda i: {
+            "ingredientes": [{"codigomex2": codigo(i), "cantidad_g": 100}, {"codigomex2": codigo(i + 1), "cantidad_g": 50}],
+        }),
+        Endpoint("POST /recetas/batch", "POST", lambda i: "/recetas/batch", lambda i: {
+            "recetas": [{"ingredientes": [{"codigomex2": codigo(i + k), "cantidad_g": 80}]} for k in range(5)],
+        }),
+        Endpoint(
+            "POST /alimentos/bulk", "POST", lambda i: "/alimentos/bulk?format=ndjson",
+            lambda i: "".join(json.dumps({"nombre_del_alimento": f"BENCH {i}-{k}", "protein": k}) + "\n" for k in range(50)),
+            "application/x-ndjson",
+        ),
+    ]
+
+
+def _percentil(ordenadas: List[float], p: float) -> float:
+    if not ordenadas:
+        return float("nan")
+    k = min(len(ordenadas) - 1, max(0, int(round(p / 100 * len(ordenadas))) - 1))
+    return ordenadas[k]
+
+
+async def _correr(client: httpx.AsyncClient, ep: Endpoint, total: int, concurrencia: int) -> Dict[str, Any]:
+    latencias: List[float] = []
+    errores = 0
+    siguiente = iter(range(total))
+
+    async def worker():
+        nonlocal errores
+        for i in siguiente:
+            kwargs: Dict[str, Any] = {}
+            if ep.body is not None:
+                body = ep.body(i)
+                if isinstance(body, str):
+                    kwargs["content"] = body.encode("utf-8")
+                    kwargs["headers"] = {"content-type": ep.content_type or "text/plain"}
+                else:
+                    kwargs["json"] = body
+            start = time.perf_counter()
+            resp = await client.request(ep.method, ep.path(i), **kwargs)
+            latencias.append(time.perf_counter() - start)
+            if resp.status_code >= 500:
+                errores += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrencia)))
+    wall = time.perf_counter() - start
+    ordenadas = sorted(latencias)
+    return {
+        "endpoint": ep.nombre,
+        "concurrencia": concurrencia,
+        "requests": len(latencias),
+        "errores": errores,
+        "rps": round(len(latencias) / wall, 1) if wall else float("inf"),
+        "p50_ms": round(_percentil(ordenadas, 50) * 1000, 2),
+        "p95_ms": round(_percentil(ordenadas, 95) * 1000, 2),
+        "p99_ms": round(_percentil(ordenadas, 99) * 1000, 2),
+        "media_ms": round(statistics.fmean(ordenadas) * 1000, 2) if ordenadas else None,
+    }
+
+
+async def main(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    from api.main import app
+    from api.config import settings
+
+    settings.SNAPSHOT_ENABLED = not args.no_snapshot
+    settings.FAST_JSON_ENABLED = args.fast_json
+
+    rows = fakes.make_rows(args.rows)
+    fakes.install(
+        rows,
+        supabase_latency=args.supabase_latency,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        backend=args.backend,
+    )
+    # Mismo arranque que en producción: snapshot, warm-up y primera ronda del monitor
+    # de salud (sin eso /health/ready y /health dan 503)
+    await app.router.startup()
+
+    endpoints = _endpoints(args.rows)
+    if args.only:
+        endpoints = [ep for ep in endpoints if any(f in ep.nombre for f in args.only.split(","))]
+
+    resultados = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for concurrencia in (int(c) for c in args.concurrency.split(",")):
+            for ep in endpoints:
+                resultados.append(await _correr(client, ep, args.requests, concurrencia))
+    await app.router.shutdown()
+    return resultados
+
+
+def _tabla(resultados: List[Dict[str, Any]]) -> str:
+    cols = ["endpoint", "concurrencia", "requests", "errores", "rps", "p50_ms", "p95_ms", "p99_ms"]
+    anchos = {c: max(len(c), *(len(str(r[c])) for r in resultados)) for c in cols}
+    lineas = ["  ".join(c.ljust(anchos[c]) for c in cols)]
+    for r in resultados:
+        lineas.append("  ".join(str(r[c]).ljust(anchos[c]) for c in cols))
+    return "\n".join(lineas)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Prueba de carga de la API con dobles locales")
+    p.add_argument("--concurrency", default="1,8,32", help="Niveles de concurrencia separados por coma")
+    p.add_argument("--requests", type=int, default=200, help="Requests por endpoint y nivel")
+    p.add_argument("--rows", type=int, default=2000, help="Filas del catálogo sintético")
+    p.add_argument("--llm-latency", type=float, default=0.2, help="Latencia del Gemini simulado (s)")
+    p.add_argument("--llm-jitter", type=float, default=0.0, help="Variación de la latencia del LLM (s)")
+    p.add_argument("--supabase-latency", type=float, default=0.01, help="Latencia de PostgREST simulada (s)")
+    p.add_argument("--backend", choices=["supabase", "memory"], default="supabase", help="Backend del repositorio")
+    p.add_argument("--no-snapshot", action="store_true", help="No cargar el snapshot en memoria")
+    p.add_argument("--fast-json", action="store_true", help="Activar FAST_JSON_ENABLED")
+    p.add_argument("--only", default="", help="Filtrar endpoints por substring (coma separados)")
+    p.add_argument("--json", dest="json_out", default="", help="Guardar resultados en este archivo JSON")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    import logging
+    logging.disable(logging.WARNING)
+    resultados = asyncio.run(main(args))
+    print(_tabla(resultados))
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+    sys.exit(0)
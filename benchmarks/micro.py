@@ -0,0 +1,115 @@
+"""
+Micro-benchmarks de las funciones calientes (sin I/O).
+
+    python -m benchmarks.micro [--number 2000]
+
+Reporta el mejor promedio por llamada (µs) de varias repeticiones con timeit.
+Antes de medir verifica los casos de regresión del validador de SQL y del
+traductor por reglas.
+"""
+
+import argparse
+import os
+import timeit
+from decimal import Decimal
+from typing import Callable, List, Tuple
+
+os.environ.setdefault("LLM_CACHE_PATH", "")
+
+from api.db.sql import _normalize_row
+from api.services.asistente_service import _extract_sql_from_text, _validate_sql
+from api.services.nl_rules import parse_question
+from api.services.sql_validator import UnsafeSQLError, _validate as _validate_sin_memo
+from api.services.receta_service import _armar_ingredientes, calcular_nutricion_batch
+from benchmarks import fakes
+
+SQL_SIMPLE = "SELECT * FROM alimentos WHERE protein >= 10 AND lipid_tot <= 10 ORDER BY protein DESC LIMIT 10"
+SQL_SUBCONSULTA = (
+    "SELECT nombre_del_alimento, energ_kcal FROM alimentos a WHERE a.iron > "
+    "(SELECT avg(iron) FROM alimentos WHERE iron IS NOT NULL) ORDER BY a.iron DESC"
+)
+SQL_RECHAZADA = "SELECT * FROM alimentos; DROP TABLE alimentos"
+# Productos cartesianos con alias: el FROM sigue abierto después de "AS x"
+SQL_CROSS_JOINS = [
+    "SELECT count(*) FROM alimentos AS a, alimentos AS b, alimentos AS c, alimentos AS d",
+    "SELECT count(*) FROM alimentos a, alimentos b",
+    "SELECT * FROM alimentos WHERE codigomex2 IN "
+    "(SELECT a.codigomex2 FROM alimentos AS a, alimentos AS b, alimentos AS c)",
+]
+# Traductor por reglas: separadores de miles, unidades y LIMIT 1 sin orden
+PREGUNTAS_REGLAS = [
+    ("alimentos con más de 1.500 kcal", "SELECT * FROM alimentos WHERE energ_kcal >= 1500 LIMIT 10"),
+    ("alimentos con menos de 2,5 g de grasa", "SELECT * FROM alimentos WHERE lipid_tot <= 2.5 LIMIT 10"),
+    ("alimentos con más de 500 mg de proteína", "SELECT * FROM alimentos WHERE protein >= 0.5 LIMIT 10"),
+    ("alimentos con más de 300 mg de calorías", None),
+    ("¿Qué alimento tiene más de 10 g de proteína?",
+     "SELECT * FROM alimentos WHERE protein >= 10 ORDER BY protein DESC LIMIT 1"),
+    ("¿Qué alimento tiene entre 5 y 10 g de fibra?", None),
+    ("dame 0 alimentos con más hierro", None),
+    ("dame 3 alimentos con más hierro",
+     "SELECT * FROM alimentos WHERE iron IS NOT NULL ORDER BY iron DESC LIMIT 3"),
+]
+LLM_TEXTO = "Claro, acá está la consulta:\n```sql\n" + SQL_SIMPLE + ";\n```\nEspero que sirva."
+
+
+def _verificar() -> None:
+    """
+    Casos de regresión: el validador no deja pasar productos cartesianos y el
+    traductor por reglas respeta números, unidades y orden.
+    """
+    for sql in SQL_CROSS_JOINS:
+        assert _validate_sql(sql, 10) is None, f"el validador aceptó un producto cartesiano: {sql}"
+    for sql in (SQL_SIMPLE, SQL_SUBCONSULTA):
+        assert _validate_sql(sql, 10) is not None, f"el validador rechazó una consulta válida: {sql}"
+    for pregunta, esperada in PREGUNTAS_REGLAS:
+        obtenida = parse_question(pregunta, 10)
+        assert obtenida == esperada, f"{pregunta!r}: {obtenida} (se esperaba {esperada})"
+
+
+def _sin_memo(sql: str) -> None:
+    try:
+        _validate_sin_memo(sql, 10, 25)
+    except UnsafeSQLError:
+        pass
+
+
+def _casos() -> List[Tuple[str, Callable[[], object]]]:
+    rows = fakes.make_rows(200)
+    fila_decimal = {k: (Decimal(str(v)) if isinstance(v, float) else v) for k, v in rows[0].items()}
+    por_codigo = {r["codigomex2"]: r for r in rows}
+    receta = [{"codigomex2": c, "cantidad_g": 50 + c} for c in range(1, 9)]
+    ingredientes = _armar_ingredientes(receta, por_codigo)
+    lote = [_armar_ingredientes([{"codigomex2": 1 + (k + j) % 200, "cantidad_g": 100} for j in range(6)], por_codigo) for k in range(50)]
+
+    return [
+        ("_validate_sql (simple)", lambda: _validate_sql(SQL_SIMPLE, 10)),
+        ("_validate_sql (subconsulta)", lambda: _validate_sql(SQL_SUBCONSULTA, 10)),
+        ("_validate_sql (rechazada)", lambda: _validate_sql(SQL_RECHAZADA, 10)),
+        ("validación sin memo (simple)", lambda: _sin_memo(SQL_SIMPLE)),
+        ("validación sin memo (subconsulta)", lambda: _sin_memo(SQL_SUBCONSULTA)),
+        ("_extract_sql_from_text", lambda: _extract_sql_from_text(LLM_TEXTO)),
+        ("parse_question (plantilla)", lambda: parse_question("Dame alimentos altos en proteína y bajos en grasa", 10)),
+        ("parse_question (al LLM)", lambda: parse_question("¿Qué conviene comer antes de entrenar?", 10)),
+        ("_normalize_row (30 columnas Decimal)", lambda: _normalize_row(fila_decimal)),
+        ("_armar_ingredientes (8 ingredientes)", lambda: _armar_ingredientes(receta, por_codigo)),
+        ("calcular_nutricion_batch (1 receta)", lambda: calcular_nutricion_batch([ingredientes])),
+        ("calcular_nutricion_batch (50 recetas)", lambda: calcular_nutricion_batch(lote)),
+    ]
+
+
+def main(number: int, repeat: int) -> None:
+    import logging
+    logging.disable(logging.WARNING)
+    _verificar()
+    ancho = max(len(nombre) for nombre, _ in _casos())
+    for nombre, fn in _casos():
+        tiempos = timeit.repeat(fn, number=number, repeat=repeat)
+        print(f"{nombre.ljust(ancho)}  {min(tiempos) / number * 1e6:10.2f} µs")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Micro-benchmarks de funciones calientes")
+    p.add_argument("--number", type=int, default=2000, help="Llamadas por repetición")
+    p.add_argument("--repeat", type=int, default=5, help="Repeticiones (se reporta la mejor)")
+    a = p.parse_args()
+    main(a.number, a.repeat)